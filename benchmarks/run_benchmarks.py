@@ -0,0 +1,341 @@
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.feature_store import read_dataset, write_dataset
+from src.data.generate_data import generate_demand_data, generate_multi_series_data
+from src.decision.capacity_model import estimate_capacity
+from src.decision.cost_analysis import calculate_expected_cost, find_optimal_buffer
+from src.decision.pipeline import run_decision_pipeline
+from src.decision.risk_detection import (
+    assign_root_cause,
+    detect_capacity_risk,
+    detect_risk_with_uncertainty,
+    suppress_redundant_alerts
+)
+from src.decision.what_if_simulation import evaluate_scenario_grid, run_what_if_scenario
+from src.features.feature_engineering import create_multi_series_features
+from src.models.evaluate_forecast import FEATURES, add_uncertainty_bounds
+
+HISTORY_PATH = "benchmarks/history.json"
+
+# size label -> (series, days per series)
+SIZES = {
+    "1k": (1, 1000),
+    "100k": (100, 1000),
+    "1M": (1000, 1000),
+    "10M": (5000, 2000),
+}
+DEFAULT_SIZES = ["1k", "100k", "1M"]
+
+# GradientBoostingRegressor training is fitted on at most this many rows,
+# otherwise the large sizes would be dominated by one stage
+TRAIN_ROWS_CAP = 20_000
+
+# Slowdowns below this many seconds are treated as timer noise
+NOISE_FLOOR_SECONDS = 0.01
+
+# Baseline = median of this many most recent passing runs per stage
+BASELINE_RUNS = 5
+
+BUFFER_CANDIDATES = [1.0, 1.05, 1.1, 1.15, 1.2]
+
+
+# --------------------------------------------------
+# DATA PREPARATION (untimed)
+# --------------------------------------------------
+
+def prepare(size, data_dir):
+    """
+    Generate raw data, features, a trained model and the decision-chain
+    frame for one size, so every stage worker only loads its inputs
+    """
+    n_series, days = SIZES[size]
+
+    if n_series == 1:
+        raw = generate_demand_data(days=days).assign(series_id=0)
+    else:
+        raw = generate_multi_series_data(n_series=n_series, days=days)
+    write_dataset(raw, os.path.join(data_dir, "raw"), partition_by_month=False)
+
+    features = create_multi_series_features(raw)
+    write_dataset(features, os.path.join(data_dir, "features"), partition_by_month=False)
+
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    train = features.iloc[:TRAIN_ROWS_CAP]
+    model = GradientBoostingRegressor(
+        n_estimators=200, learning_rate=0.05, max_depth=4, random_state=42
+    )
+    model.fit(train[FEATURES], train["demand"])
+    joblib.dump(model, os.path.join(data_dir, "model.pkl"))
+
+    features["forecast"] = model.predict(features[FEATURES])
+    residual_std = np.std(features["demand"] - features["forecast"])
+    decision = add_uncertainty_bounds(features, residual_std)
+    decision = estimate_capacity(decision)
+    decision = detect_capacity_risk(decision)
+    write_dataset(decision, os.path.join(data_dir, "decision"), partition_by_month=False)
+
+
+# --------------------------------------------------
+# STAGES
+# --------------------------------------------------
+# Every stage is (load inputs, timed call). Inputs are loaded before the
+# clock starts; the call returns the number of rows it processed.
+
+def _load(data_dir, name):
+    return read_dataset(os.path.join(data_dir, name), mmap=False)
+
+
+def _load_model(data_dir):
+    return joblib.load(os.path.join(data_dir, "model.pkl"))
+
+
+def _fit(df):
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    train = df.iloc[:TRAIN_ROWS_CAP]
+    GradientBoostingRegressor(
+        n_estimators=200, learning_rate=0.05, max_depth=4, random_state=42
+    ).fit(train[FEATURES], train["demand"])
+    return len(train)
+
+
+def _optimal_buffer(df):
+    # Every candidate buffer is costed over every row
+    find_optimal_buffer(df, BUFFER_CANDIDATES)
+    return len(df) * len(BUFFER_CANDIDATES)
+
+
+STAGES = {
+    "features": (
+        lambda d: _load(d, "raw"),
+        lambda df: len(create_multi_series_features(df))
+    ),
+    "train": (
+        lambda d: _load(d, "features"),
+        _fit
+    ),
+    "predict": (
+        lambda d: (_load(d, "features"), _load_model(d)),
+        lambda inputs: len(inputs[1].predict(inputs[0][FEATURES]))
+    ),
+    "estimate_capacity": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(estimate_capacity(df))
+    ),
+    "detect_capacity_risk": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(detect_capacity_risk(df))
+    ),
+    "detect_risk_with_uncertainty": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(detect_risk_with_uncertainty(df))
+    ),
+    "suppress_redundant_alerts": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(suppress_redundant_alerts(df, series_col="series_id"))
+    ),
+    "assign_root_cause": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(assign_root_cause(df, series_col="series_id"))
+    ),
+    "calculate_expected_cost": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(calculate_expected_cost(df))
+    ),
+    "decision_pipeline": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(run_decision_pipeline(
+            df,
+            params={"alerts": {"series_col": "series_id"},
+                    "root_cause": {"series_col": "series_id"}}
+        ))
+    ),
+    "run_what_if_scenario": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(run_what_if_scenario(df, 0.2, 3))
+    ),
+    "evaluate_scenario_grid": (
+        lambda d: _load(d, "decision"),
+        lambda df: len(df) * len(evaluate_scenario_grid(
+            df, np.linspace(-0.3, 0.5, 9), np.arange(-5, 11, 5)
+        ))
+    ),
+    "find_optimal_buffer": (
+        lambda d: _load(d, "decision"),
+        _optimal_buffer
+    ),
+}
+
+
+def run_stage(stage, data_dir, repeat):
+    """
+    Time one stage in this process (best of `repeat`) and report peak RSS
+    """
+    load, call = STAGES[stage]
+    inputs = load(data_dir)
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = call(inputs)
+        times.append(time.perf_counter() - start)
+
+    seconds = min(times)
+    return {
+        "stage": stage,
+        "rows": int(rows),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else float("inf"),
+        # ru_maxrss is in KiB on Linux; includes the loaded inputs
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+# --------------------------------------------------
+# HARNESS
+# --------------------------------------------------
+
+def _subprocess(args):
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_benchmarks", *args],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    return completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ""
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_regressions(results, history, threshold):
+    """
+    Results slower than the baseline of the same (size, stage) by more
+    than `threshold` (0.2 = 20%). The baseline is the median of the last
+    BASELINE_RUNS runs that did not regress, so a slow run is recorded but
+    never becomes the reference for the next one.
+    """
+    earlier = {}
+    for run in history:
+        failed = {(r["size"], r["stage"]) for r in run.get("regressions", [])}
+        for r in run["results"]:
+            key = (r["size"], r["stage"])
+            if key not in failed:
+                earlier.setdefault(key, []).append(r["seconds"])
+
+    previous = {
+        key: float(np.median(seconds[-BASELINE_RUNS:]))
+        for key, seconds in earlier.items()
+    }
+
+    regressions = []
+    for r in results:
+        before = previous.get((r["size"], r["stage"]))
+        if before is None:
+            continue
+        if (r["seconds"] > before * (1 + threshold)
+                and r["seconds"] - before > NOISE_FLOOR_SECONDS):
+            regressions.append({**r, "previous_seconds": before})
+    return regressions
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=None, repeat=3,
+                   history_path=HISTORY_PATH, threshold=0.2):
+    """
+    Benchmark every stage at every size, each stage in a fresh process so
+    its peak RSS is its own. Appends the run (and its regressions) to the
+    JSON history and returns (results, regressions against the baseline).
+    """
+    stages = list(stages or STAGES)
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{size}-") as data_dir:
+            _subprocess(["--prepare", size, data_dir])
+
+            for stage in stages:
+                result = json.loads(_subprocess(
+                    ["--stage", stage, data_dir, "--repeat", str(repeat)]
+                ))
+                result["size"] = size
+                results.append(result)
+                print(
+                    f"{size:>5} {stage:<30} {result['seconds']:9.4f}s "
+                    f"{result['rows_per_second']:14,.0f} rows/s "
+                    f"{result['peak_rss_mb']:8.1f} MB"
+                )
+
+    history = load_history(history_path)
+    regressions = find_regressions(results, history, threshold)
+
+    history.append({
+        "timestamp": pd.Timestamp.now().isoformat(),
+        "commit": _git_commit(),
+        "results": results,
+        "regressions": [
+            {"size": r["size"], "stage": r["stage"]} for r in regressions
+        ]
+    })
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    with open(history_path, "w") as f:
+        json.dump(history, f, indent=2)
+
+    return results, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage benchmarks across data sizes")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, choices=list(SIZES))
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fail when a stage is this much slower (0.2 = 20%%)")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--prepare", nargs=2, metavar=("SIZE", "DIR"),
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--stage", nargs=2, metavar=("STAGE", "DIR"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        prepare(*args.prepare)
+    elif args.stage:
+        print(json.dumps(run_stage(args.stage[0], args.stage[1], args.repeat)))
+    else:
+        _, regressions = run_benchmarks(
+            args.sizes, args.stages, args.repeat, args.history, args.threshold
+        )
+        for r in regressions:
+            print(
+                f"❌ Regression: {r['size']} {r['stage']} "
+                f"{r['previous_seconds']:.4f}s -> {r['seconds']:.4f}s"
+            )
+        sys.exit(1 if regressions else 0)
@@ -1,6 +1,7 @@
 # ============================================================
 # PATH FIX — REQUIRED FOR STREAMLIT + SRC PACKAGE
 # ============================================================
+import json
 import os
 import sys
 
@@ -11,10 +12,13 @@ if PROJECT_ROOT not in sys.path:
 # ============================================================
 # IMPORTS
 # ============================================================
+from functools import cache, partial
+
 import streamlit as st
 import pandas as pd
-import joblib
 
+from src.data.compact_schema import compact_frame
+from src.data.load_data import load_feature_data
 from src.decision.capacity_model import estimate_capacity
 from src.decision.risk_detection import (
     detect_capacity_risk,
@@ -23,7 +27,14 @@ from src.decision.risk_detection import (
     assign_root_cause
 )
 from src.decision.cost_analysis import calculate_expected_cost
+from src.decision.scenario_index import ScenarioIndex
 from src.decision.what_if_simulation import backtest_resource_decision
+from src.models.evaluate_forecast import FEATURES, add_uncertainty_bounds
+from src.models.registry import active_version
+from src.models.registry import load_model as load_registered_model
+from src.utils import instrumentation
+from src.utils.downsampling import cached_chart_frame
+from src.utils.stage_cache import StageCache, column_tokens, run_stage
 
 # ============================================================
 # PAGE CONFIG
@@ -70,58 +81,87 @@ st.caption("Forecast demand • Detect risk early • Simulate decisions • Opt
 # ============================================================
 @st.cache_data
 def load_data():
-    df = pd.read_csv("data/processed/forecast_features.csv")
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    # Compact dtypes (float32 / int8 / categorical) keep every cached
+    # scenario 3-5x smaller; see src.data.compact_schema for the tolerance
+    return compact_frame(load_feature_data(), inplace=True)
 
-@st.cache_resource
 def load_model():
-    return joblib.load("models/demand_forecast_model.pkl")
+    # Registry keeps its own process-wide cache and follows hot swaps
+    return load_registered_model()
+
+@st.cache_resource
+def load_column_tokens():
+    return column_tokens(load_data())
+
+@st.cache_resource
+def get_stage_cache():
+    # One cache for all sessions
+    return StageCache()
 
 base_df = load_data()
 model = load_model()
 
 # ============================================================
-# FORECAST + UNCERTAINTY
+# PIPELINE STAGES
 # ============================================================
-def add_forecast_with_uncertainty(df, model, confidence=0.9):
-    features = [
-        "demand_lag_1", "demand_lag_7", "demand_lag_14",
-        "rolling_mean_7", "rolling_std_7", "rolling_mean_14",
-        "day_of_week", "is_weekend",
-        "avg_resolution_time", "active_resources",
-        "backlog", "demand_growth_rate"
-    ]
-
-    df = df.copy()
-    df["forecast"] = model.predict(df[features])
-
-    residual_std = (df["demand"] - df["forecast"]).std()
-    z = 1.65 if confidence == 0.9 else 1.96
+def scale_demand(df, demand_change):
+    df["demand"] = df["demand"] * (1 + demand_change)
+    return df
 
-    df["forecast_lower"] = df["forecast"] - z * residual_std
-    df["forecast_upper"] = df["forecast"] + z * residual_std
+def shift_resources(df, resource_change):
+    df["active_resources"] = df["active_resources"] + resource_change
+    return df
 
+def predict_forecast(df, model, model_version):
+    df["forecast"] = model.predict(df[FEATURES])
     return df
 
+def add_forecast_bounds(df, confidence=0.9):
+    residual_std = (df["demand"] - df["forecast"]).std()
+    return add_uncertainty_bounds(df, residual_std, confidence)
+
 # ============================================================
 # RECOMPUTE PIPELINE
 # ============================================================
+# Each stage declares the columns it reads and writes and is looked up in
+# the shared stage cache by the provenance of those inputs, so a slider
+# change only re-runs the stages downstream of it (a demand change never
+# re-runs the model or capacity)
+@instrumentation.instrument()
 def recompute_pipeline(df, model, demand_change, resource_change):
-    df = df.copy()
-
-    df["demand"] = df["demand"] * (1 + demand_change)
-    df["active_resources"] = df["active_resources"] + resource_change
-
-    df = add_forecast_with_uncertainty(df, model)
-    df = estimate_capacity(df)
-    df = detect_capacity_risk(df)
-    df = detect_risk_with_uncertainty(df)
-    df = suppress_redundant_alerts(df)
-    df = assign_root_cause(df)
-    df = calculate_expected_cost(df)
-
-    return df
+    columns = {col: df[col].values for col in df.columns}
+    tokens = dict(load_column_tokens())
+    stage = partial(run_stage, get_stage_cache(), columns, tokens, compact=True)
+
+    stage("scale_demand", scale_demand, ["demand"], ["demand"],
+          {"demand_change": demand_change})
+    stage("shift_resources", shift_resources,
+          ["active_resources"], ["active_resources"],
+          {"resource_change": resource_change})
+
+    stage("forecast", partial(predict_forecast, model=model),
+          FEATURES, ["forecast"],
+          {"model_version": active_version() or "legacy"})
+    stage("forecast_bounds", add_forecast_bounds,
+          ["demand", "forecast"], ["forecast_lower", "forecast_upper"])
+
+    stage("capacity", estimate_capacity,
+          ["active_resources"], ["estimated_capacity"])
+    stage("capacity_risk", detect_capacity_risk,
+          ["demand", "estimated_capacity"], ["capacity_gap", "risk_severity"])
+    stage("uncertainty_risk", detect_risk_with_uncertainty,
+          ["forecast_upper", "estimated_capacity"],
+          ["worst_case_gap", "uncertainty_aware_risk"])
+    stage("alerts", suppress_redundant_alerts,
+          ["date", "risk_severity"], ["alert_allowed"])
+    stage("root_cause", assign_root_cause,
+          ["demand", "rolling_mean_7", "active_resources", "backlog"],
+          ["root_cause"])
+    stage("cost", calculate_expected_cost,
+          ["risk_severity", "estimated_capacity", "demand"],
+          ["sla_risk_cost", "idle_capacity", "idle_cost", "total_expected_cost"])
+
+    return pd.DataFrame(columns)
 
 # ============================================================
 # SAFE KPI HELPER
@@ -173,43 +213,72 @@ if "df_scenario" not in st.session_state:
     st.session_state.df_scenario = recompute_pipeline(
         base_df, model, 0.0, 0
     )
+    st.session_state.scenario_key = (0.0, 0, active_version())
+    st.session_state.scenario_index = ScenarioIndex(st.session_state.df_scenario)
 
 if apply_clicked:
     with st.spinner("Recomputing forecasts & decisions..."):
         st.session_state.df_scenario = recompute_pipeline(
             base_df, model, demand_change, resource_change
         )
+        st.session_state.scenario_key = (
+            demand_change, resource_change, active_version()
+        )
+        st.session_state.scenario_index = ScenarioIndex(
+            st.session_state.df_scenario
+        )
 
 df = st.session_state.df_scenario
 
+# Charts are downsampled (peaks kept) and cached per scenario + filters
+view_key = (
+    frozenset(load_column_tokens().items()),
+    st.session_state.scenario_key,
+    str(date_range),
+    tuple(risk_filter)
+)
+
 # ============================================================
 # FILTERED VIEW
 # ============================================================
-df_view = df[
-    (df["date"] >= pd.to_datetime(date_range[0])) &
-    (df["date"] <= pd.to_datetime(date_range[1])) &
-    (df["risk_severity"].isin(risk_filter))
-]
+# Filters and KPIs are answered from the scenario index (O(log n), no
+# row copies); rows are only materialized for charts / backtest on a miss
+scenario_index = st.session_state.scenario_index
+view_filter = (
+    pd.to_datetime(date_range[0]),
+    pd.to_datetime(date_range[1]),
+    risk_filter
+)
+
+@cache
+def get_view():
+    return df.iloc[scenario_index.positions(*view_filter)]
+
+def view_cached(name, compute):
+    if st.session_state.get("view_cache_key") != view_key:
+        st.session_state.view_cache_key = view_key
+        st.session_state.view_cache = {}
+    if name not in st.session_state.view_cache:
+        st.session_state.view_cache[name] = compute()
+    return st.session_state.view_cache[name]
 
 # ============================================================
 # KPIs (SAFE)
 # ============================================================
 k1, k2, k3, k4 = st.columns(4)
 
-avg_demand = safe_int(df_view["demand"].mean())
-critical_days = safe_int((df_view["risk_severity"] == "CRITICAL").sum())
-total_cost = safe_int(df_view["total_expected_cost"].sum())
-utilization = (
-    df_view["demand"].sum() / df_view["estimated_capacity"].sum()
-    if len(df_view) > 0 else 0
-)
+kpis = scenario_index.kpis(*view_filter)
+avg_demand = safe_int(kpis["avg_demand"])
+critical_days = safe_int(kpis["critical_days"])
+total_cost = safe_int(kpis["total_cost"])
+utilization = kpis["utilization"]
 
 k1.metric("Avg Daily Demand", avg_demand)
 k2.metric("Critical Risk Days", critical_days)
 k3.metric("Total Est. Cost (₹)", f"{total_cost:,}")
 k4.metric("Capacity Utilization", f"{int(utilization * 100)}%")
 
-if df_view.empty:
+if kpis["rows"] == 0:
     st.warning(
         "No data available for selected filters. "
         "Adjust date range or risk severity."
@@ -231,27 +300,33 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 # ------------------------------------------------------------
 with tab1:
     st.subheader("Demand vs Capacity")
-    st.line_chart(df_view.set_index("date")[["demand", "estimated_capacity"]])
+    st.line_chart(cached_chart_frame(
+        (view_key, "demand_capacity"), get_view, "date",
+        ["demand", "estimated_capacity"]
+    ))
 
     st.subheader("Risk Distribution")
-    st.bar_chart(df_view["risk_severity"].value_counts())
+    st.bar_chart(
+        scenario_index.counts(*view_filter).sort_values(ascending=False)
+    )
 
 # ------------------------------------------------------------
 with tab2:
     st.subheader("Forecast with Confidence Bounds")
-    st.line_chart(
-        df_view.set_index("date")[["forecast", "forecast_lower", "forecast_upper"]]
-    )
+    st.line_chart(cached_chart_frame(
+        (view_key, "forecast_bounds"), get_view, "date",
+        ["forecast", "forecast_lower", "forecast_upper"]
+    ))
     st.info("Decisions are based on worst-case (upper-bound) forecasts.")
 
 # ------------------------------------------------------------
 with tab3:
     st.subheader("Risk Details")
     st.dataframe(
-        df_view[
+        df.iloc[scenario_index.tail_positions(*view_filter, n=20)][
             ["date", "demand", "estimated_capacity",
              "risk_severity", "root_cause", "alert_allowed"]
-        ].tail(20),
+        ],
         use_container_width=True
     )
 
@@ -268,7 +343,10 @@ with tab4:
 with tab5:
     st.subheader("Historical Decision Backtesting")
 
-    backtest = backtest_resource_decision(df_view, resource_change=3)
+    backtest = view_cached(
+        "backtest",
+        lambda: backtest_resource_decision(get_view(), resource_change=3)
+    )
 
     c1, c2, c3 = st.columns(3)
     c1.metric("Actual Risk Days", backtest["actual_risk_days"])
@@ -277,6 +355,40 @@ with tab5:
 
     st.info("Backtesting quantifies how proactive decisions reduce risk.")
 
+# ============================================================
+# DIAGNOSTICS (only with DEMAND_INSTRUMENTATION set)
+# ============================================================
+if instrumentation.is_enabled():
+    with st.expander("🔧 Diagnostics", expanded=False):
+        snapshot = instrumentation.metrics_snapshot()
+
+        if snapshot["stages"]:
+            stages = pd.DataFrame(snapshot["stages"]).T
+            stages["avg_seconds"] = stages["total_seconds"] / stages["calls"]
+            st.dataframe(
+                stages.sort_values("total_seconds", ascending=False),
+                use_container_width=True
+            )
+        if snapshot["caches"]:
+            st.dataframe(pd.DataFrame(snapshot["caches"]).T, use_container_width=True)
+        st.caption(f"Stage cache: {get_stage_cache().stats()}")
+
+        d1, d2 = st.columns(2)
+        d1.download_button(
+            "Metrics (JSON)",
+            json.dumps(snapshot, indent=2),
+            file_name="metrics.json"
+        )
+        d2.download_button(
+            "Metrics (Prometheus)",
+            instrumentation.prometheus_text(),
+            file_name="metrics.prom"
+        )
+
+        if snapshot["enabled"]["profile"] and snapshot["stages"]:
+            profiled = st.selectbox("Profile", sorted(snapshot["stages"]))
+            st.code(instrumentation.profile_report(profiled))
+
 # ============================================================
 # FOOTER
 # ============================================================
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from src.decision.risk_rules import DEFAULT_ROOT_CAUSE, ROOT_CAUSE_RULES, SEVERITY_LEVELS
+
+# --------------------------------------------------
+# SCHEMA
+# --------------------------------------------------
+# Target dtype per known column. Integer targets are only applied when the
+# values are whole numbers within range; otherwise (e.g. a scaled what-if
+# demand, 125 * 1.2) the column stays float64, since severities compare it
+# exactly against whole-number thresholds. "float32" is used for model inputs
+# and decision outputs, whose float64 digits carry no information: tree
+# models compare inputs as float32 anyway, and demand / capacity / cost
+# magnitudes are far inside float32's ~7 significant digits.
+COMPACT_SCHEMA = {
+    "series_id": "int32",
+    "demand": "int32",
+    "active_resources": "int32",
+    "backlog": "int32",
+    "estimated_capacity": "int32",
+    "idle_capacity": "int32",
+    "day_of_week": "int8",
+    "is_weekend": "int8",
+    "avg_resolution_time": "float32",
+    "demand_growth_rate": "float32",
+    "demand_lag_1": "float32",
+    "demand_lag_7": "float32",
+    "demand_lag_14": "float32",
+    "rolling_mean_7": "float32",
+    "rolling_std_7": "float32",
+    "rolling_mean_14": "float32",
+    "forecast": "float32",
+    "forecast_lower": "float32",
+    "forecast_upper": "float32",
+    "capacity_gap": "float32",
+    "worst_case_gap": "float32",
+    "sla_risk_cost": "float32",
+    "idle_cost": "float32",
+    "total_expected_cost": "float32",
+    "alert_allowed": "bool",
+}
+
+# Label columns -> their fixed category lists (int8 codes underneath)
+CATEGORICAL_SCHEMA = {
+    "risk_severity": (SEVERITY_LEVELS, True),
+    "uncertainty_aware_risk": (SEVERITY_LEVELS, True),
+    "root_cause": ([rule[0] for rule in ROOT_CAUSE_RULES] + [DEFAULT_ROOT_CAUSE], False),
+}
+
+# Compact vs float64 path: a float column passes when
+#   max |compact - reference| <= COMPACT_RTOL * max |reference|
+# (float32 rounding is relative to the column's scale, and differences of
+# nearby values, e.g. capacity gaps, inherit the error of their inputs).
+# Label columns may differ only on rows whose float64 gap sits within
+# rounding distance of a severity threshold.
+COMPACT_RTOL = 1e-5
+COMPACT_MAX_LABEL_MISMATCH = 1e-4
+
+
+def compact_column(name, values):
+    """
+    One column converted to its compact dtype (unchanged when unknown or
+    when the conversion would lose information)
+    """
+    if name in CATEGORICAL_SCHEMA:
+        categories, ordered = CATEGORICAL_SCHEMA[name]
+        if isinstance(values.dtype, pd.CategoricalDtype) \
+                and list(values.dtype.categories) == list(categories):
+            return values
+        return pd.Categorical(values, categories=categories, ordered=ordered)
+
+    target = COMPACT_SCHEMA.get(name)
+    if target is None or not pd.api.types.is_numeric_dtype(values.dtype) \
+            or str(values.dtype) == target:
+        return values
+
+    array = np.asarray(values)
+
+    if target == "bool":
+        return array.astype(bool) if np.isin(array, [0, 1]).all() else values
+
+    if target.startswith("int"):
+        info = np.iinfo(target)
+        whole = np.isfinite(array).all() and (array == np.round(array)).all()
+        if whole and (len(array) == 0
+                      or (array.min() >= info.min and array.max() <= info.max)):
+            return array.astype(target)
+        return values
+
+    return array.astype(target)
+
+
+def compact_frame(df, inplace=False):
+    """
+    Apply the compact schema to every known column; other columns are
+    left as they are
+    """
+    if not inplace:
+        df = df.copy(deep=False)
+    for col in df.columns:
+        converted = compact_column(col, df[col])
+        if converted is not df[col]:
+            df[col] = converted
+    return df
+
+
+# --------------------------------------------------
+# TOLERANCE CHECK
+# --------------------------------------------------
+
+def compare_to_reference(reference, compact, rtol=COMPACT_RTOL,
+                         max_label_mismatch=COMPACT_MAX_LABEL_MISMATCH):
+    """
+    Check a compact-path result against the float64 path, column by column.
+
+    Returns one row per shared column with the max absolute error, the
+    allowed error (rtol * column scale), the label mismatch rate and
+    whether the column passes. Call `.all()` on the "ok" column for a
+    single verdict.
+    """
+    rows = []
+    for col in reference.columns:
+        if col not in compact.columns:
+            continue
+        ref, cmp = reference[col], compact[col]
+        row = {"column": col, "max_abs_error": 0.0, "allowed_error": 0.0,
+               "mismatch_rate": 0.0}
+
+        if pd.api.types.is_numeric_dtype(ref.dtype) and not pd.api.types.is_bool_dtype(ref.dtype):
+            r = ref.to_numpy(dtype=np.float64)
+            c = cmp.to_numpy(dtype=np.float64)
+            both = ~(np.isnan(r) | np.isnan(c))
+            row["mismatch_rate"] = float(np.mean(np.isnan(r) != np.isnan(c))) if len(r) else 0.0
+            if both.any():
+                row["max_abs_error"] = float(np.max(np.abs(r[both] - c[both])))
+                row["allowed_error"] = float(rtol * np.max(np.abs(r[both])))
+            row["ok"] = (row["max_abs_error"] <= row["allowed_error"]
+                         and row["mismatch_rate"] == 0)
+        else:
+            equal = ref.astype(object).to_numpy() == cmp.astype(object).to_numpy()
+            row["mismatch_rate"] = float(1 - equal.mean()) if len(equal) else 0.0
+            row["ok"] = row["mismatch_rate"] <= max_label_mismatch
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def memory_ratio(reference, compact):
+    return (
+        reference.memory_usage(deep=True).sum()
+        / compact.memory_usage(deep=True).sum()
+    )
@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "_meta.json"
+
+
+# --------------------------------------------------
+# WRITING
+# --------------------------------------------------
+
+def _encode_column(values):
+    """
+    Return (array, categories) for one column; strings are stored as int32
+    codes so every column is a fixed-width, memory-mappable array
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object \
+            or pd.api.types.is_string_dtype(values.dtype):
+        codes, categories = pd.factorize(values, sort=True)
+        return codes.astype(np.int32), [str(c) for c in categories]
+
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values.to_numpy().astype("datetime64[ns]"), None
+
+    return values.to_numpy(), None
+
+
+def write_partition(df, partition_dir, date_col="date"):
+    """
+    Write one partition as a directory of per-column .npy files plus a
+    small _meta.json (row count, date range, categories)
+    """
+    os.makedirs(partition_dir, exist_ok=True)
+
+    meta = {"rows": len(df), "columns": list(df.columns), "categories": {}}
+
+    for col in df.columns:
+        array, categories = _encode_column(df[col])
+        np.save(os.path.join(partition_dir, f"{col}.npy"), array)
+        if categories is not None:
+            meta["categories"][col] = categories
+
+    if date_col in df.columns and len(df):
+        dates = df[date_col].to_numpy().astype("datetime64[ns]")
+        meta["date_min"] = str(dates.min())
+        meta["date_max"] = str(dates.max())
+        meta["date_sorted"] = bool((dates[1:] >= dates[:-1]).all())
+
+    # Meta goes last: a partition without it is incomplete and ignored
+    with open(os.path.join(partition_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def _month_groups(df, date_col):
+    months = pd.to_datetime(df[date_col]).dt.strftime("%Y-%m")
+    # Positional, so a non-unique index cannot duplicate or misplace rows
+    for month, positions in months.groupby(months, sort=True).indices.items():
+        yield f"{date_col}={month}", df.iloc[positions]
+
+
+def write_dataset(df, path, date_col="date", partition_by_month=True):
+    """
+    Write a frame as a columnar dataset, one partition per calendar month
+    """
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    if not partition_by_month:
+        write_partition(df, os.path.join(path, "part-00000"), date_col)
+        return
+
+    for name, part in _month_groups(df, date_col):
+        write_partition(part, os.path.join(path, name, "part-00000"), date_col)
+
+
+def append_to_dataset(df, path, date_col="date"):
+    """
+    Append a chunk to a month-partitioned dataset without rewriting it
+    """
+    for name, part in _month_groups(df, date_col):
+        month_dir = os.path.join(path, name)
+        os.makedirs(month_dir, exist_ok=True)
+        part_id = len([p for p in os.listdir(month_dir) if p.startswith("part-")])
+        write_partition(
+            part, os.path.join(month_dir, f"part-{part_id:05d}"), date_col
+        )
+
+
+# --------------------------------------------------
+# READING
+# --------------------------------------------------
+
+def list_partitions(path):
+    """
+    Return (partition_dir, meta) for every complete partition, in order
+    """
+    partitions = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        if META_FILE in files:
+            with open(os.path.join(root, META_FILE)) as f:
+                partitions.append((root, json.load(f)))
+    return partitions
+
+
+def _row_slice(partition_dir, meta, date_col, start, end):
+    """
+    Rows of a partition inside [start, end]: a slice when the partition is
+    date-sorted (zero-copy), otherwise a boolean mask
+    """
+    if start is None and end is None:
+        return slice(None)
+
+    dates = np.load(os.path.join(partition_dir, f"{date_col}.npy"), mmap_mode="r")
+
+    if meta.get("date_sorted"):
+        lo = 0 if start is None else np.searchsorted(dates, start, side="left")
+        hi = len(dates) if end is None else np.searchsorted(dates, end, side="right")
+        return slice(int(lo), int(hi))
+
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= start
+    if end is not None:
+        mask &= dates <= end
+    return mask
+
+
+def read_columns(path, columns=None, start_date=None, end_date=None,
+                 date_col="date", mmap=True):
+    """
+    Read a dataset as a dict of NumPy arrays.
+
+    Partitions outside the date range are skipped from their metadata
+    alone, only the requested columns are opened, and with `mmap=True` a
+    single date-sorted partition is returned as memory-mapped views
+    without copying. String columns come back as pandas Categoricals.
+    """
+    start = None if start_date is None else np.datetime64(pd.Timestamp(start_date), "ns")
+    end = None if end_date is None else np.datetime64(pd.Timestamp(end_date), "ns")
+
+    pieces = {}
+    categories = {}
+
+    for partition_dir, meta in list_partitions(path):
+        if meta["rows"] == 0:
+            continue
+        if start is not None and "date_max" in meta and np.datetime64(meta["date_max"]) < start:
+            continue
+        if end is not None and "date_min" in meta and np.datetime64(meta["date_min"]) > end:
+            continue
+
+        rows = _row_slice(partition_dir, meta, date_col, start, end)
+
+        for col in columns or meta["columns"]:
+            array = np.load(
+                os.path.join(partition_dir, f"{col}.npy"),
+                mmap_mode="r" if mmap else None
+            )[rows]
+
+            pieces.setdefault(col, []).append(array)
+            if col in meta["categories"]:
+                categories.setdefault(col, []).append(meta["categories"][col])
+
+    out = {}
+    for col, arrays in pieces.items():
+        if col in categories:
+            out[col] = _merge_categorical(arrays, categories[col])
+        elif len(arrays) == 1:
+            out[col] = arrays[0]
+        else:
+            out[col] = np.concatenate(arrays)
+
+    return out
+
+
+def _merge_categorical(code_arrays, category_lists):
+    """
+    Re-map per-partition category codes onto one sorted category set
+    """
+    merged = pd.Index(sorted(set().union(*category_lists)))
+
+    codes = []
+    for array, categories in zip(code_arrays, category_lists):
+        if not categories:
+            codes.append(np.full(len(array), -1))
+            continue
+        mapping = merged.get_indexer(categories)
+        codes.append(np.where(array >= 0, mapping[array], -1))
+
+    return pd.Categorical.from_codes(np.concatenate(codes), merged)
+
+
+def read_dataset(path, columns=None, start_date=None, end_date=None,
+                 date_col="date", mmap=True):
+    """
+    Read a dataset (or a column / date-range subset of it) as a DataFrame
+    """
+    data = read_columns(path, columns, start_date, end_date, date_col, mmap)
+    return pd.DataFrame(data, columns=columns or list(data), copy=False)
+
+
+if __name__ == "__main__":
+    # Convert the CSV artifacts into columnar datasets
+    raw = pd.read_csv("data/raw/demand_data.csv", parse_dates=["date"])
+    write_dataset(raw, "data/raw/demand_data")
+
+    features = pd.read_csv(
+        "data/processed/forecast_features.csv", parse_dates=["date"]
+    )
+    write_dataset(features, "data/processed/forecast_features")
+
+    print("✅ Feature store written")
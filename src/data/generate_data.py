@@ -1,6 +1,12 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
+from src.data.feature_store import write_partition
+
 def generate_demand_data(
     start_date="2022-01-01",
     days=730
@@ -36,6 +42,139 @@ def generate_demand_data(
     return df
 
 
+# --------------------------------------------------
+# MULTI-SERIES LOAD-TEST DATA
+# --------------------------------------------------
+
+def generate_multi_series_data(
+    n_series=100,
+    days=730,
+    start_date="2022-01-01",
+    first_series_id=0,
+    rng=None
+):
+    """
+    Generate demand for many independent series (queues / teams) at once.
+
+    Every column is built as an (n_series, days) NumPy block, so there is no
+    per-series Python loop. Each series gets its own scale, seasonal phase
+    and trend, with the same shape as `generate_demand_data`.
+    Rows are ordered by series, then date.
+    """
+    if rng is None:
+        rng = np.random.default_rng(42)
+
+    dates = pd.date_range(start=start_date, periods=days, freq="D")
+    day_of_year = dates.dayofyear.to_numpy()
+    shape = (n_series, days)
+
+    base_demand = rng.uniform(60, 200, size=(n_series, 1))
+    amplitude = base_demand * rng.uniform(0.05, 0.25, size=(n_series, 1))
+    phase = rng.uniform(0, 2 * np.pi, size=(n_series, 1))
+    growth = base_demand * rng.uniform(0.0, 0.4, size=(n_series, 1))
+
+    seasonal = amplitude * np.sin(2 * np.pi * day_of_year / 365 + phase)
+    trend = growth * np.linspace(0, 1, days)
+    noise = rng.normal(0, 1, size=shape) * (base_demand * 0.08)
+
+    demand = base_demand + seasonal + trend + noise
+    demand = np.maximum(demand, 20).astype(np.int64)
+
+    # Staffing scales with each series' typical load (about 6 tickets/resource)
+    typical_resources = np.maximum(np.rint(base_demand / 6), 2).astype(np.int64)
+    active_resources = typical_resources + rng.integers(-3, 4, size=shape)
+    active_resources = np.maximum(active_resources, 1)
+    avg_resolution_time = rng.normal(4, 0.5, size=shape)
+    backlog = np.maximum(demand - active_resources * 6, 0)
+
+    growth_rate = np.zeros(shape)
+    growth_rate[:, 1:] = demand[:, 1:] / demand[:, :-1] - 1
+
+    day_of_week = dates.dayofweek.to_numpy()
+
+    df = pd.DataFrame({
+        "series_id": np.repeat(
+            np.arange(first_series_id, first_series_id + n_series), days
+        ),
+        "date": np.tile(dates.to_numpy(), n_series),
+        "demand": demand.ravel(),
+        "avg_resolution_time": avg_resolution_time.ravel(),
+        "active_resources": active_resources.ravel(),
+        "backlog": backlog.ravel(),
+        "day_of_week": np.tile(day_of_week, n_series),
+        "is_weekend": np.tile((day_of_week >= 5).astype(np.int64), n_series),
+        "demand_growth_rate": growth_rate.ravel()
+    })
+
+    return df
+
+
+def _generate_chunk(task):
+    chunk_id, first_series_id, n_series, days, start_date, seed_seq, out_dir = task
+
+    rng = np.random.default_rng(seed_seq)
+    df = generate_multi_series_data(
+        n_series=n_series,
+        days=days,
+        start_date=start_date,
+        first_series_id=first_series_id,
+        rng=rng
+    )
+
+    write_partition(df, os.path.join(out_dir, f"part-{chunk_id:05d}"))
+    return chunk_id, len(df)
+
+
+def generate_demand_dataset(
+    out_dir="data/raw/demand_dataset",
+    n_series=1000,
+    days=730,
+    start_date="2022-01-01",
+    series_per_chunk=100,
+    n_workers=None,
+    seed=42
+):
+    """
+    Generate an N series x D days dataset on a process pool, chunk by chunk.
+
+    Each chunk of `series_per_chunk` series gets its own generator spawned
+    from `np.random.SeedSequence(seed)`, so the output is identical for any
+    number of workers. Chunks are written straight to `out_dir/part-XXXXX/`
+    as feature-store partitions (see `src.data.feature_store`); the parent
+    process never holds the data.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    n_chunks = -(-n_series // series_per_chunk)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    tasks = []
+    for chunk_id in range(n_chunks):
+        first = chunk_id * series_per_chunk
+        size = min(series_per_chunk, n_series - first)
+        tasks.append(
+            (chunk_id, first, size, days, start_date, seeds[chunk_id], out_dir)
+        )
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        rows = dict(pool.map(_generate_chunk, tasks))
+
+    manifest = {
+        "n_series": n_series,
+        "days": days,
+        "start_date": start_date,
+        "seed": seed,
+        "partitions": [
+            {"path": f"part-{chunk_id:05d}", "rows": rows[chunk_id]}
+            for chunk_id in range(n_chunks)
+        ]
+    }
+    with open(os.path.join(out_dir, "_manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
 if __name__ == "__main__":
     df = generate_demand_data()
     df.to_csv("data/raw/demand_data.csv", index=False)
@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+
+from src.data.feature_store import read_dataset
+
+RAW_CSV_PATH = "data/raw/demand_data.csv"
+RAW_STORE_PATH = "data/raw/demand_data"
+FEATURE_CSV_PATH = "data/processed/forecast_features.csv"
+FEATURE_STORE_PATH = "data/processed/forecast_features"
+
+
+def _load(path, columns, start_date, end_date):
+    if os.path.isdir(path):
+        return read_dataset(path, columns, start_date, end_date)
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + ["date"]))
+
+    df = pd.read_csv(path, usecols=usecols, parse_dates=["date"])
+
+    if start_date is not None:
+        df = df[df["date"] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df["date"] <= pd.Timestamp(end_date)]
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    return df.reset_index(drop=True)
+
+
+def load_demand_data(path=None, columns=None, start_date=None, end_date=None):
+    """
+    Load raw demand data, preferring the columnar store over the CSV
+    """
+    if path is None:
+        path = RAW_STORE_PATH if os.path.isdir(RAW_STORE_PATH) else RAW_CSV_PATH
+    return _load(path, columns, start_date, end_date)
+
+
+def load_feature_data(path=None, columns=None, start_date=None, end_date=None):
+    """
+    Load model-ready features, preferring the columnar store over the CSV.
+
+    Only `columns` and rows within [start_date, end_date] are read, with
+    dates already parsed.
+    """
+    if path is None:
+        path = (
+            FEATURE_STORE_PATH if os.path.isdir(FEATURE_STORE_PATH)
+            else FEATURE_CSV_PATH
+        )
+    return _load(path, columns, start_date, end_date)
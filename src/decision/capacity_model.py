@@ -1,6 +1,9 @@
 import pandas as pd
 
+from src.utils.instrumentation import instrument
 
+
+@instrument()
 def estimate_capacity(df, tickets_per_resource_per_day=6):
     """
     Estimate daily handling capacity based on available resources
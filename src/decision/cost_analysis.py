@@ -1,4 +1,18 @@
 import numpy as np
+import pandas as pd
+
+from src.utils.instrumentation import instrument
+
+# Share of the SLA penalty expected at each risk severity
+SEVERITY_COST_WEIGHTS = {
+    "LOW": 0,
+    "MEDIUM": 0.3,
+    "HIGH": 0.7,
+    "CRITICAL": 1.0
+}
+
+
+@instrument()
 def calculate_expected_cost(
     df,
     sla_penalty_cost=500,
@@ -8,12 +22,7 @@ def calculate_expected_cost(
 
     df["sla_risk_cost"] = (
         df["risk_severity"]
-        .map({
-            "LOW": 0,
-            "MEDIUM": 0.3,
-            "HIGH": 0.7,
-            "CRITICAL": 1.0
-        }) * sla_penalty_cost
+        .map(SEVERITY_COST_WEIGHTS).astype(float) * sla_penalty_cost
     )
 
     df["idle_capacity"] = (
@@ -30,32 +39,192 @@ def calculate_expected_cost(
 
 
 
+@instrument()
 def find_optimal_buffer(
     df,
     buffer_candidates=[1.0, 1.05, 1.1, 1.15, 1.2],
     sla_penalty_cost=500,
     idle_resource_cost=100
 ):
-    results = []
+    buffers = np.asarray(buffer_candidates, dtype=np.float64)
+    upper = df["forecast_upper"].to_numpy(dtype=np.float64)
+    capacity = df["estimated_capacity"].to_numpy(dtype=np.float64)
+
+    # Breach days per candidate in one (candidates x days) comparison
+    breaches = (upper[None, :] - capacity[None, :] * buffers[:, None] > 0).sum(axis=1)
+    sla_cost = breaches * sla_penalty_cost
+
+    # Idle cost does not depend on the buffer in this model
+    idle_cost = (
+        (df["estimated_capacity"] - df["forecast"]).clip(lower=0)
+        * idle_resource_cost
+    ).sum()
+
+    total_cost = sla_cost + idle_cost
+    best = int(np.argmin(total_cost))
+
+    return buffer_candidates[best], total_cost[best]
+
+
+# --------------------------------------------------
+# EXACT BUFFER COST CURVE
+# --------------------------------------------------
+
+def _curve_components(upper, forecast, capacity, buffer_range):
+    """
+    Breach days and idle units at every breakpoint of the cost curve.
+
+    A day breaches while forecast_upper / capacity > buffer, and holds
+    idle capacity max(capacity * buffer - forecast, 0). Both are piecewise
+    linear in the buffer, with kinks only at these ratios, so sorting the
+    ratios once and taking cumulative sums gives the curve at every
+    breakpoint in O(n log n).
+    """
+    lo, hi = buffer_range
+
+    # Days without capacity do not react to the buffer
+    fixed = capacity <= 0
+    fixed_breaches = int((upper[fixed] > 0).sum())
+    fixed_idle = np.maximum(-forecast[fixed], 0).sum()
+    upper, forecast, capacity = upper[~fixed], forecast[~fixed], capacity[~fixed]
+
+    breach_ratio = np.sort(upper / capacity)
+
+    idle_ratio = forecast / capacity
+    order = np.argsort(idle_ratio)
+    idle_ratio = idle_ratio[order]
+    cum_capacity = np.concatenate([[0.0], np.cumsum(capacity[order])])
+    cum_forecast = np.concatenate([[0.0], np.cumsum(forecast[order])])
+
+    buffers = np.concatenate([[lo, hi], breach_ratio, idle_ratio])
+    buffers = np.unique(buffers[(buffers >= lo) & (buffers <= hi)])
+
+    breach_days = (
+        len(breach_ratio)
+        - np.searchsorted(breach_ratio, buffers, side="right")
+        + fixed_breaches
+    )
+
+    k = np.searchsorted(idle_ratio, buffers, side="left")
+    idle_units = buffers * cum_capacity[k] - cum_forecast[k] + fixed_idle
+
+    return buffers, breach_days, idle_units
+
+
+def buffer_cost_curve(
+    df,
+    buffer_range=(0.8, 1.5),
+    sla_penalty_cost=500,
+    idle_resource_cost=100
+):
+    """
+    Exact total cost over a continuous capacity-buffer range.
+
+    Unlike `find_optimal_buffer`, idle cost is charged on the buffered
+    capacity, so holding a larger buffer has a price. The cost is
+    piecewise linear between the returned rows, so its minimum over the
+    range is always one of them.
+    """
+    buffers, breach_days, idle_units = _curve_components(
+        df["forecast_upper"].to_numpy(dtype=np.float64),
+        df["forecast"].to_numpy(dtype=np.float64),
+        df["estimated_capacity"].to_numpy(dtype=np.float64),
+        buffer_range
+    )
 
-    for buffer in buffer_candidates:
-        temp = df.copy()
-        temp["capacity_gap"] = (
-            temp["forecast_upper"] - temp["estimated_capacity"] * buffer
+    curve = pd.DataFrame({
+        "buffer": buffers,
+        "breach_days": breach_days,
+        "idle_units": idle_units
+    })
+    curve["sla_cost"] = curve["breach_days"] * sla_penalty_cost
+    curve["idle_cost"] = curve["idle_units"] * idle_resource_cost
+    curve["total_cost"] = curve["sla_cost"] + curve["idle_cost"]
+
+    return curve
+
+
+@instrument()
+def optimize_buffer(
+    df,
+    buffer_range=(0.8, 1.5),
+    sla_penalty_cost=500,
+    idle_resource_cost=100,
+    series_col=None
+):
+    """
+    Cheapest buffer on the exact cost curve, overall or per series
+    """
+    if series_col is None:
+        curve = buffer_cost_curve(
+            df, buffer_range, sla_penalty_cost, idle_resource_cost
         )
+        best = curve.loc[curve["total_cost"].idxmin()].to_dict()
+        best["breach_days"] = int(best["breach_days"])
+        return best
 
-        sla_cost = (
-            (temp["capacity_gap"] > 0).astype(int) * sla_penalty_cost
-        ).sum()
+    codes, uniques = pd.factorize(df[series_col])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
 
-        idle_cost = (
-            (temp["estimated_capacity"] - temp["forecast"]).clip(lower=0)
-            * idle_resource_cost
-        ).sum()
+    upper = df["forecast_upper"].to_numpy(dtype=np.float64)[order]
+    forecast = df["forecast"].to_numpy(dtype=np.float64)[order]
+    capacity = df["estimated_capacity"].to_numpy(dtype=np.float64)[order]
 
-        total_cost = sla_cost + idle_cost
+    results = []
+    for i, series_id in enumerate(uniques):
+        block = slice(bounds[i], bounds[i + 1])
+        buffers, breach_days, idle_units = _curve_components(
+            upper[block], forecast[block], capacity[block], buffer_range
+        )
+        total = breach_days * sla_penalty_cost + idle_units * idle_resource_cost
+        best = int(np.argmin(total))
+
+        results.append({
+            series_col: series_id,
+            "buffer": buffers[best],
+            "breach_days": breach_days[best],
+            "idle_units": idle_units[best],
+            "total_cost": total[best]
+        })
 
-        results.append((buffer, total_cost))
+    return pd.DataFrame(results)
+
+
+def buffer_sensitivity(
+    df,
+    sla_penalty_costs,
+    idle_resource_costs,
+    buffer_range=(0.8, 1.5)
+):
+    """
+    Optimal buffer for every (sla_penalty_cost, idle_resource_cost) pair.
+
+    The curve components are computed once; each cost pair is then a
+    broadcast over the breakpoints.
+    """
+    buffers, breach_days, idle_units = _curve_components(
+        df["forecast_upper"].to_numpy(dtype=np.float64),
+        df["forecast"].to_numpy(dtype=np.float64),
+        df["estimated_capacity"].to_numpy(dtype=np.float64),
+        buffer_range
+    )
+
+    penalty, idle = np.meshgrid(
+        np.asarray(sla_penalty_costs, dtype=np.float64),
+        np.asarray(idle_resource_costs, dtype=np.float64),
+        indexing="ij"
+    )
+    penalty, idle = penalty.ravel(), idle.ravel()
 
-    return min(results, key=lambda x: x[1])
+    total = penalty[:, None] * breach_days[None, :] + idle[:, None] * idle_units[None, :]
+    best = np.argmin(total, axis=1)
 
+    return pd.DataFrame({
+        "sla_penalty_cost": penalty,
+        "idle_resource_cost": idle,
+        "buffer": buffers[best],
+        "breach_days": breach_days[best],
+        "idle_units": idle_units[best],
+        "total_cost": total[np.arange(len(best)), best]
+    })
@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.decision.cost_analysis import SEVERITY_COST_WEIGHTS
+from src.decision.risk_rules import SEVERITY_LEVELS, severity_codes
+from src.models.evaluate_forecast import forecast_residuals
+
+# Rows that share one spawned random stream; results are reproducible for
+# any memory budget or worker count because this never changes
+SEED_BLOCK_ROWS = 256
+
+# Rough bytes held per (row, sample) cell while a batch is evaluated
+_BYTES_PER_CELL = 48
+
+_WORKER = {}
+
+
+def _residual_pools(df, residuals, series_col):
+    """
+    Return (pool, offset per row, length per row) for bootstrap sampling
+    """
+    if residuals is not None:
+        pool = np.asarray(residuals, dtype=np.float64)
+        pool = pool[~np.isnan(pool)]
+        n = len(df)
+        return pool, np.zeros(n, dtype=np.int64), np.full(n, len(pool))
+
+    errors = forecast_residuals(df)
+
+    if series_col is None:
+        pool = errors[~np.isnan(errors)]
+        n = len(df)
+        return pool, np.zeros(n, dtype=np.int64), np.full(n, len(pool))
+
+    # One pool per series, concatenated in series order, followed by the
+    # global pool for rows whose series has no residuals (or no key)
+    codes, uniques = pd.factorize(df[series_col])
+    valid = ~np.isnan(errors) & (codes >= 0)
+    order = np.argsort(codes[valid], kind="stable")
+    series_pool = errors[valid][order]
+    global_pool = errors[~np.isnan(errors)]
+    pool = np.concatenate([series_pool, global_pool])
+
+    lengths = np.bincount(codes[valid], minlength=len(uniques))
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+
+    row_offsets = np.full(len(df), len(series_pool), dtype=np.int64)
+    row_lengths = np.full(len(df), len(global_pool), dtype=np.int64)
+    own = codes >= 0
+    own[own] = lengths[codes[own]] > 0
+    row_offsets[own] = offsets[codes[own]]
+    row_lengths[own] = lengths[codes[own]]
+    return pool, row_offsets, row_lengths
+
+
+def _simulate_units(units):
+    """
+    Simulate a run of seed blocks; returns the per-row result arrays
+    """
+    w = _WORKER
+    weights = np.array([SEVERITY_COST_WEIGHTS[level] for level in SEVERITY_LEVELS])
+    critical = SEVERITY_LEVELS.index("CRITICAL")
+
+    start = units[0] * SEED_BLOCK_ROWS
+    stop = min((units[-1] + 1) * SEED_BLOCK_ROWS, len(w["forecast"]))
+    rows = slice(start, stop)
+
+    breach = np.empty(stop - start)
+    critical_prob = np.empty(stop - start)
+    cost = np.empty(stop - start)
+
+    for unit in units:
+        r = slice(unit * SEED_BLOCK_ROWS, min((unit + 1) * SEED_BLOCK_ROWS, stop))
+        out = slice(r.start - start, r.stop - start)
+
+        rng = np.random.default_rng(w["seeds"][unit])
+        # Uniform index into each row's residual pool
+        draws = rng.random((r.stop - r.start, w["n_samples"]))
+        draws *= w["lengths"][r][:, None]
+        draws = draws.astype(np.int64) + w["offsets"][r][:, None]
+
+        gap = (
+            w["forecast"][r][:, None] + w["pool"][draws]
+            - w["threshold"][r][:, None]
+        )
+        codes = severity_codes(gap)
+
+        breach[out] = (codes > 0).mean(axis=1)
+        critical_prob[out] = (codes == critical).mean(axis=1)
+        cost[out] = weights[codes].mean(axis=1) * w["sla_penalty_cost"]
+
+    return rows, breach, critical_prob, cost
+
+
+def _init_worker(state):
+    _WORKER.clear()
+    _WORKER.update(state)
+
+
+def simulate_sla_breach(
+    df,
+    residuals=None,
+    n_samples=2000,
+    buffer_ratio=1.1,
+    sla_penalty_cost=500,
+    series_col=None,
+    seed=42,
+    memory_budget_mb=256,
+    n_workers=1
+):
+    """
+    Monte Carlo SLA-breach probabilities from the forecast error distribution.
+
+    For every row, `n_samples` demand outcomes are drawn as
+    forecast + a bootstrapped residual (from `residuals`, or the frame's own
+    `demand - forecast`, per series when `series_col` is set; a series
+    without residuals, or a missing series key, samples from all of them).
+    Adds:
+
+    - breach_probability: P(demand > estimated_capacity * buffer_ratio)
+    - critical_probability: P(severity is CRITICAL)
+    - expected_sla_cost: severity-weighted SLA penalty averaged over samples
+
+    Rows are simulated in batches sized by `memory_budget_mb`, optionally
+    across `n_workers` processes. Each block of SEED_BLOCK_ROWS rows has its
+    own stream spawned from `seed`, so results do not depend on the budget
+    or the number of workers.
+    """
+    df = df.copy()
+
+    pool, offsets, lengths = _residual_pools(df, residuals, series_col)
+    if len(pool) == 0:
+        raise ValueError("No residuals available to sample from")
+
+    n_rows = len(df)
+    n_units = -(-n_rows // SEED_BLOCK_ROWS)
+
+    state = {
+        "pool": pool,
+        "offsets": offsets,
+        "lengths": lengths,
+        "forecast": df["forecast"].to_numpy(dtype=np.float64),
+        "threshold": df["estimated_capacity"].to_numpy(dtype=np.float64) * buffer_ratio,
+        "seeds": np.random.SeedSequence(seed).spawn(n_units),
+        "n_samples": n_samples,
+        "sla_penalty_cost": sla_penalty_cost
+    }
+
+    cells = memory_budget_mb * 2**20 // _BYTES_PER_CELL
+    units_per_batch = max(1, int(cells // (SEED_BLOCK_ROWS * n_samples)))
+    batches = [
+        list(range(u, min(u + units_per_batch, n_units)))
+        for u in range(0, n_units, units_per_batch)
+    ]
+
+    breach = np.empty(n_rows)
+    critical_prob = np.empty(n_rows)
+    cost = np.empty(n_rows)
+
+    if n_workers == 1:
+        _init_worker(state)
+        results = map(_simulate_units, batches)
+    else:
+        pool_executor = ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(state,)
+        )
+        results = pool_executor.map(_simulate_units, batches)
+
+    try:
+        for rows, b, c, e in results:
+            breach[rows] = b
+            critical_prob[rows] = c
+            cost[rows] = e
+    finally:
+        if n_workers != 1:
+            pool_executor.shutdown()
+
+    df["breach_probability"] = breach
+    df["critical_probability"] = critical_prob
+    df["expected_sla_cost"] = cost
+
+    return df
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from src.data.compact_schema import compact_column
+from src.data.load_data import load_feature_data
+from src.decision.cost_analysis import SEVERITY_COST_WEIGHTS
+from src.decision.risk_detection import cooldown_alerts
+from src.decision.risk_rules import (
+    ROOT_CAUSE_RULES,
+    SEVERITY_LEVELS,
+    classify_root_cause,
+    classify_severity
+)
+from src.utils.instrumentation import instrument
+
+# --------------------------------------------------
+# STAGE KERNELS
+# --------------------------------------------------
+# Every kernel takes {column: array} holding only the columns the stage
+# reads, and returns {column: new array} for the columns it writes. Inputs
+# are never modified, so source columns can be shared without copies.
+
+def capacity_kernel(cols, tickets_per_resource_per_day=6):
+    return {
+        "estimated_capacity": cols["active_resources"] * tickets_per_resource_per_day
+    }
+
+
+def capacity_risk_kernel(cols, buffer_ratio=1.1):
+    gap = cols["demand"] - cols["estimated_capacity"] * buffer_ratio
+    return {"capacity_gap": gap, "risk_severity": classify_severity(gap)}
+
+
+def uncertainty_risk_kernel(cols, buffer_ratio=1.1):
+    gap = cols["forecast_upper"] - cols["estimated_capacity"] * buffer_ratio
+    return {"worst_case_gap": gap, "uncertainty_aware_risk": classify_severity(gap)}
+
+
+def alerts_kernel(cols, cooldown_days=3, series_col=None, state=None):
+    """
+    With a `state` dict (see `suppress_redundant_alerts`) the cooldowns
+    continue from it, and it is updated in place for the next run
+    """
+    allowed, new_state = cooldown_alerts(
+        cols["date"],
+        cols["risk_severity"],
+        None if series_col is None else cols[series_col],
+        cooldown_days,
+        state
+    )
+    if state is not None:
+        state.clear()
+        state.update(new_state)
+    return {"alert_allowed": allowed}
+
+
+def root_cause_kernel(cols, series_col=None):
+    frame = pd.DataFrame(cols, copy=False)
+    return {"root_cause": classify_root_cause(frame, series_col=series_col)}
+
+
+def cost_kernel(cols, sla_penalty_cost=500, idle_resource_cost=100):
+    weights = np.array([SEVERITY_COST_WEIGHTS[level] for level in SEVERITY_LEVELS])
+    codes = pd.Categorical(
+        cols["risk_severity"], categories=SEVERITY_LEVELS
+    ).codes
+
+    sla_risk_cost = np.where(codes >= 0, weights[codes], np.nan) * sla_penalty_cost
+    idle_capacity = np.clip(cols["estimated_capacity"] - cols["demand"], 0, None)
+    idle_cost = idle_capacity * idle_resource_cost
+
+    return {
+        "sla_risk_cost": sla_risk_cost,
+        "idle_capacity": idle_capacity,
+        "idle_cost": idle_cost,
+        "total_expected_cost": sla_risk_cost + idle_cost
+    }
+
+
+def _root_cause_reads():
+    reads = []
+    for _, column, _, reference, _ in ROOT_CAUSE_RULES:
+        reads.append(column)
+        reads.append(reference.split(":")[-1] if reference.startswith("@") else reference)
+    return list(dict.fromkeys(reads))
+
+
+# name -> (reads, writes, kernel); series-aware stages also read the
+# `series_col` parameter's column
+DECISION_STAGES = {
+    "capacity": (
+        ["active_resources"], ["estimated_capacity"], capacity_kernel
+    ),
+    "capacity_risk": (
+        ["demand", "estimated_capacity"],
+        ["capacity_gap", "risk_severity"],
+        capacity_risk_kernel
+    ),
+    "uncertainty_risk": (
+        ["forecast_upper", "estimated_capacity"],
+        ["worst_case_gap", "uncertainty_aware_risk"],
+        uncertainty_risk_kernel
+    ),
+    "alerts": (
+        ["date", "risk_severity"], ["alert_allowed"], alerts_kernel
+    ),
+    "root_cause": (
+        _root_cause_reads(), ["root_cause"], root_cause_kernel
+    ),
+    "cost": (
+        ["risk_severity", "estimated_capacity", "demand"],
+        ["sla_risk_cost", "idle_capacity", "idle_cost", "total_expected_cost"],
+        cost_kernel
+    ),
+}
+
+DEFAULT_STAGE_ORDER = [
+    "capacity", "capacity_risk", "uncertainty_risk", "alerts", "root_cause", "cost"
+]
+
+
+# --------------------------------------------------
+# EXECUTOR
+# --------------------------------------------------
+
+def _stage_reads(name, params):
+    reads = list(DECISION_STAGES[name][0])
+    series_col = params.get("series_col")
+    if series_col is not None:
+        reads.append(series_col)
+    return reads
+
+
+@instrument()
+def run_decision_pipeline(df, stages=DEFAULT_STAGE_ORDER, outputs=None,
+                          params=None, compact=False):
+    """
+    Run decision stages over one shared column buffer, without copying
+    the frame.
+
+    Source columns are referenced, not copied; each stage only allocates
+    the columns it writes. With `outputs` (a list of column names) the run
+    is pruned: stages nobody needs are skipped, and intermediate columns
+    are released once no later stage reads them, so only the requested
+    columns are ever held at the end. `params` maps stage name -> kwargs.
+    With compact=True every column a stage writes is stored in its compact
+    dtype (src.data.compact_schema) as soon as it is produced.
+
+    Returns a new DataFrame; `df` is left untouched.
+    """
+    params = params or {}
+    stage_params = [params.get(name, {}) for name in stages]
+    source = set(df.columns)
+
+    # Backward pass: which stages and columns the requested outputs need
+    if outputs is None:
+        needed = set(source)
+        for name in stages:
+            needed.update(DECISION_STAGES[name][1])
+        active = list(range(len(stages)))
+    else:
+        needed = set(outputs)
+        active = []
+        for i in reversed(range(len(stages))):
+            writes = DECISION_STAGES[stages[i]][1]
+            if needed.intersection(writes):
+                active.append(i)
+                needed.update(_stage_reads(stages[i], stage_params[i]))
+        active.reverse()
+        needed = set(outputs) | needed
+
+    # Last stage (by position) reading each column
+    last_use = {}
+    for i in active:
+        for col in _stage_reads(stages[i], stage_params[i]):
+            last_use[col] = i
+
+    cols = {col: df[col].values for col in df.columns if col in needed}
+
+    for i in active:
+        name = stages[i]
+        reads = _stage_reads(name, stage_params[i])
+        kernel = DECISION_STAGES[name][2]
+
+        written = kernel({col: cols[col] for col in reads}, **stage_params[i])
+        if compact:
+            written = {col: compact_column(col, v) for col, v in written.items()}
+        cols.update(written)
+
+        if outputs is not None:
+            for col in reads:
+                if last_use.get(col) == i and col not in outputs:
+                    del cols[col]
+
+    if outputs is None:
+        ordered = list(df.columns) + [
+            col for col in cols if col not in source
+        ]
+    else:
+        ordered = list(outputs)
+
+    return pd.DataFrame({col: cols[col] for col in ordered}, index=df.index, copy=False)
+
+
+if __name__ == "__main__":
+    df = load_feature_data()
+    df["forecast_upper"] = df["demand"] + 15
+
+    result = run_decision_pipeline(
+        df, outputs=["date", "risk_severity", "root_cause", "total_expected_cost"]
+    )
+    print(result.tail())
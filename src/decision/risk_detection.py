@@ -1,21 +1,28 @@
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
+from src.decision.risk_rules import (
+    SEVERITY_LEVELS,
+    SEVERITY_THRESHOLDS,
+    classify_root_cause,
+    classify_severity,
+    severity_codes
+)
+from src.utils.instrumentation import instrument
+
 # --------------------------------------------------
 # BASIC CAPACITY-BASED RISK SEVERITY
 # --------------------------------------------------
 
 def assign_risk_severity(capacity_gap):
-    if capacity_gap <= 0:
-        return "LOW"
-    elif capacity_gap <= 10:
-        return "MEDIUM"
-    elif capacity_gap <= 25:
-        return "HIGH"
-    else:
-        return "CRITICAL"
+    return SEVERITY_LEVELS[severity_codes([capacity_gap])[0]]
 
 
-def detect_capacity_risk(df, buffer_ratio=1.1):
+@instrument()
+def detect_capacity_risk(df, buffer_ratio=1.1, thresholds=SEVERITY_THRESHOLDS):
     """
     Detect risk severity based on demand vs capacity
     """
@@ -25,7 +32,7 @@ def detect_capacity_risk(df, buffer_ratio=1.1):
         df["demand"] - df["estimated_capacity"] * buffer_ratio
     )
 
-    df["risk_severity"] = df["capacity_gap"].apply(assign_risk_severity)
+    df["risk_severity"] = classify_severity(df["capacity_gap"], thresholds)
 
     return df
 
@@ -34,7 +41,8 @@ def detect_capacity_risk(df, buffer_ratio=1.1):
 # UNCERTAINTY-AWARE RISK ESCALATION (WORST CASE)
 # --------------------------------------------------
 
-def detect_risk_with_uncertainty(df, buffer_ratio=1.1):
+@instrument()
+def detect_risk_with_uncertainty(df, buffer_ratio=1.1, thresholds=SEVERITY_THRESHOLDS):
     """
     Escalate risk using forecast upper bound
     """
@@ -50,17 +58,9 @@ def detect_risk_with_uncertainty(df, buffer_ratio=1.1):
         df["forecast_upper"] - df["estimated_capacity"] * buffer_ratio
     )
 
-    def uncertainty_severity(x):
-        if x <= 0:
-            return "LOW"
-        elif x <= 10:
-            return "MEDIUM"
-        elif x <= 25:
-            return "HIGH"
-        else:
-            return "CRITICAL"
-
-    df["uncertainty_aware_risk"] = df["worst_case_gap"].apply(uncertainty_severity)
+    df["uncertainty_aware_risk"] = classify_severity(
+        df["worst_case_gap"], thresholds
+    )
 
     return df
 
@@ -69,38 +69,149 @@ def detect_risk_with_uncertainty(df, buffer_ratio=1.1):
 # ALERT FATIGUE CONTROL (COOLDOWN LOGIC)
 # --------------------------------------------------
 
-def suppress_redundant_alerts(df, cooldown_days=3):
+ALERT_LEVELS = ["HIGH", "CRITICAL"]
+
+_DAY_NS = 86_400 * 10**9
+
+
+def cooldown_scan(dates_ns, severity, series, cooldown_days,
+                  last_date, last_severity):
     """
-    Prevent repeated alerts when severity does not change
+    Linear cooldown scan over int64 dates (ns), int8 severity codes and
+    int series codes.
+
+    Only HIGH/CRITICAL rows are visited. An alert is suppressed when the
+    last allowed alert of the same series has the same severity and is at
+    most `cooldown_days` whole days earlier. `last_date` / `last_severity`
+    are per-series lists (None = no alert yet), updated in place so the
+    caller can carry them to the next run.
     """
-    df = df.copy()
+    allowed = np.ones(len(severity), dtype=bool)
+
+    alert_codes = [SEVERITY_LEVELS.index(level) for level in ALERT_LEVELS]
+    rows = np.flatnonzero(np.isin(severity, alert_codes))
+
+    # "days_diff <= cooldown" on whole days == "diff < (cooldown + 1) days"
+    window = (cooldown_days + 1) * _DAY_NS
+
+    for i, date, sev, s in zip(
+        rows.tolist(),
+        dates_ns[rows].tolist(),
+        severity[rows].tolist(),
+        series[rows].tolist()
+    ):
+        last = last_date[s]
+        if last is not None and sev == last_severity[s] and date - last < window:
+            allowed[i] = False
+        else:
+            last_date[s] = date
+            last_severity[s] = sev
 
-    # Ensure datetime
-    df["date"] = pd.to_datetime(df["date"])
+    return allowed
+
+
+def cooldown_alerts(dates, risk_severity, series=None, cooldown_days=3,
+                    state=None):
+    """
+    Cooldown over array-likes of dates, severities and (optionally) series
+    ids, seeded from a previous run's `state`. Returns (alert_allowed,
+    new_state); see `suppress_redundant_alerts` for the state format.
+    """
+    dates_ns = (
+        pd.to_datetime(dates).to_numpy().astype("datetime64[ns]").view(np.int64)
+    )
+    severity = pd.Categorical(
+        risk_severity, categories=SEVERITY_LEVELS
+    ).codes.astype(np.int8)
 
-    df["alert_allowed"] = True
+    if series is None:
+        series_codes = np.zeros(len(severity), dtype=np.int64)
+        series_ids = [None]
+    else:
+        series_codes, uniques = pd.factorize(series)
+        series_ids = list(uniques)
+
+    state = dict(state or {})
+    for sid in state:
+        if sid not in series_ids:
+            series_ids.append(sid)
+
+    last_date = [None] * len(series_ids)
+    last_severity = [None] * len(series_ids)
+    for s, sid in enumerate(series_ids):
+        if sid in state:
+            date, level = state[sid]
+            last_date[s] = pd.Timestamp(date).as_unit("ns").value
+            last_severity[s] = SEVERITY_LEVELS.index(level)
+
+    allowed = cooldown_scan(
+        dates_ns, severity, series_codes, cooldown_days, last_date, last_severity
+    )
 
-    last_alert_date = None
-    last_severity = None
+    new_state = {
+        sid: (pd.Timestamp(last_date[s]), SEVERITY_LEVELS[last_severity[s]])
+        for s, sid in enumerate(series_ids)
+        if last_date[s] is not None
+    }
+    return allowed, new_state
 
-    for i, row in df.iterrows():
-        severity = row["risk_severity"]
-        current_date = row["date"]  # datetime guaranteed
 
-        if severity in ["HIGH", "CRITICAL"]:
-            if last_alert_date is not None:
-                days_diff = (current_date - last_alert_date).days
+@instrument()
+def suppress_redundant_alerts(df, cooldown_days=3, series_col=None,
+                              state=None, return_state=False):
+    """
+    Prevent repeated alerts when severity does not change
 
-                if days_diff <= cooldown_days and severity == last_severity:
-                    df.at[i, "alert_allowed"] = False
-                else:
-                    last_alert_date = current_date
-                    last_severity = severity
-            else:
-                last_alert_date = current_date
-                last_severity = severity
+    Rows are scanned in frame order, with an independent cooldown per
+    series when `series_col` is given. `state` maps series id (None for a
+    single series) to the (last_alert_date, last_severity) left by a
+    previous run; with `return_state=True` the updated mapping is
+    returned too, so daily runs continue where the last one stopped.
+    """
+    df = df.copy()
 
-    return df
+    # Ensure datetime
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"])
+
+    df["alert_allowed"], new_state = cooldown_alerts(
+        df["date"],
+        df["risk_severity"],
+        None if series_col is None else df[series_col],
+        cooldown_days,
+        state
+    )
+
+    if not return_state:
+        return df
+    return df, new_state
+
+
+def save_alert_state(state, path):
+    """
+    Persist cooldown state returned by `suppress_redundant_alerts`
+    """
+    records = [
+        {
+            "series_id": sid.item() if isinstance(sid, np.generic) else sid,
+            "last_alert_date": pd.Timestamp(date).isoformat(),
+            "last_severity": level
+        }
+        for sid, (date, level) in state.items()
+    ]
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def load_alert_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        records = json.load(f)
+    return {
+        r["series_id"]: (pd.Timestamp(r["last_alert_date"]), r["last_severity"])
+        for r in records
+    }
 
 
 
@@ -108,26 +219,17 @@ def suppress_redundant_alerts(df, cooldown_days=3):
 # ROOT CAUSE ATTRIBUTION
 # --------------------------------------------------
 
-def assign_root_cause(df):
+@instrument()
+def assign_root_cause(df, series_col=None):
     """
     Identify primary driver behind risk increase
+
+    Resource and backlog baselines are taken over the whole frame, or per
+    series when `series_col` is given.
     """
     df = df.copy()
 
-    avg_resources = df["active_resources"].mean()
-    high_backlog = df["backlog"].quantile(0.75)
-
-    def root_cause(row):
-        if row["demand"] > row["rolling_mean_7"] * 1.15:
-            return "Demand Spike"
-        elif row["active_resources"] < avg_resources:
-            return "Resource Drop"
-        elif row["backlog"] > high_backlog:
-            return "Backlog Accumulation"
-        else:
-            return "Mixed Factors"
-
-    df["root_cause"] = df.apply(root_cause, axis=1)
+    df["root_cause"] = classify_root_cause(df, series_col=series_col)
 
     return df
 
@@ -0,0 +1,113 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------
+# RULE TABLES
+# --------------------------------------------------
+
+# Severity levels in increasing order, and the upper (inclusive) gap bound
+# of every level but the last: gap <= 0 is LOW, <= 10 MEDIUM, <= 25 HIGH,
+# anything above (or missing) CRITICAL.
+SEVERITY_LEVELS = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+SEVERITY_THRESHOLDS = [0, 10, 25]
+
+# Root-cause rules, evaluated in order; the first match wins.
+# (label, column, comparison, reference, factor): the row matches when
+# `column <comparison> reference * factor`. A reference starting with "@"
+# is a statistic of the frame (or of the row's series):
+#   "@mean:<col>" -> mean of <col>, "@q75:<col>" -> 75th percentile of <col>
+ROOT_CAUSE_RULES = [
+    ("Demand Spike", "demand", ">", "rolling_mean_7", 1.15),
+    ("Resource Drop", "active_resources", "<", "@mean:active_resources", 1.0),
+    ("Backlog Accumulation", "backlog", ">", "@q75:backlog", 1.0),
+]
+DEFAULT_ROOT_CAUSE = "Mixed Factors"
+
+_COMPARISONS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+# --------------------------------------------------
+# SEVERITY
+# --------------------------------------------------
+
+def severity_codes(gap, thresholds=SEVERITY_THRESHOLDS):
+    """
+    Map capacity gaps to severity level codes (0 = LOW ... 3 = CRITICAL).
+
+    The code is the number of thresholds strictly below the gap (what
+    `searchsorted(side="left")` returns), counted with one comparison per
+    threshold, which is faster for a short table. Missing gaps are
+    CRITICAL, as in the original if/elif chain.
+    """
+    gap = np.asarray(gap, dtype=np.float64)
+
+    codes = np.zeros(gap.shape, dtype=np.int8)
+    for threshold in thresholds:
+        codes += gap > threshold
+    codes[np.isnan(gap)] = len(thresholds)
+
+    return codes
+
+
+def classify_severity(gap, thresholds=SEVERITY_THRESHOLDS, levels=SEVERITY_LEVELS):
+    """
+    Severity of every gap as an ordered Categorical
+    """
+    return pd.Categorical.from_codes(
+        severity_codes(gap, thresholds),
+        categories=levels,
+        ordered=True
+    )
+
+
+# --------------------------------------------------
+# ROOT CAUSE
+# --------------------------------------------------
+
+def _reference_values(df, reference, series_col):
+    if not reference.startswith("@"):
+        return df[reference].to_numpy(dtype=np.float64)
+
+    stat, col = reference[1:].split(":")
+    values = df[col]
+
+    if stat == "mean":
+        if series_col is None:
+            return values.mean()
+        return values.groupby(df[series_col]).transform("mean").to_numpy()
+
+    if stat.startswith("q"):
+        q = int(stat[1:]) / 100
+        if series_col is None:
+            return values.quantile(q)
+        return values.groupby(df[series_col]).transform("quantile", q).to_numpy()
+
+    raise ValueError(f"Unknown rule statistic: {stat}")
+
+
+def classify_root_cause(df, rules=ROOT_CAUSE_RULES, default=DEFAULT_ROOT_CAUSE,
+                        series_col=None):
+    """
+    Evaluate the root-cause rule table for all rows at once.
+
+    Every rule becomes one boolean array and `np.select` picks the first
+    match per row. With `series_col`, "@" statistics are computed per
+    series instead of over the whole frame.
+    """
+    conditions = []
+    for _, column, comparison, reference, factor in rules:
+        left = df[column].to_numpy(dtype=np.float64)
+        right = _reference_values(df, reference, series_col) * factor
+        conditions.append(_COMPARISONS[comparison](left, right))
+
+    labels = [rule[0] for rule in rules] + [default]
+    codes = np.select(conditions, np.arange(len(rules)), default=len(rules))
+
+    return pd.Categorical.from_codes(codes.astype(np.int8), categories=labels)
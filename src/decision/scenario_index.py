@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from src.decision.risk_rules import SEVERITY_LEVELS
+
+# Columns with prefix sums (NaN counted as 0, like pandas' skipna sums)
+INDEXED_SUMS = ["demand", "estimated_capacity", "total_expected_cost"]
+
+
+class ScenarioIndex:
+    """
+    Date/severity index over one scenario frame, built once per scenario.
+
+    For every severity level it keeps that level's frame positions sorted
+    by date, the matching dates as int64, and prefix sums of the
+    INDEXED_SUMS columns (plus non-missing demand counts). A date range is
+    two `searchsorted` calls per level, so counts, sums and the dashboard
+    KPIs for any date range + severity filter cost O(levels * log n) and
+    never touch the rows themselves.
+    """
+
+    def __init__(self, df, date_col="date", severity_col="risk_severity",
+                 levels=SEVERITY_LEVELS):
+        self.levels = list(levels)
+        self.n_rows = len(df)
+
+        dates = pd.to_datetime(df[date_col]).to_numpy().astype("datetime64[ns]").view(np.int64)
+        codes = pd.Categorical(df[severity_col], categories=self.levels).codes
+
+        values = {col: df[col].to_numpy(dtype=np.float64) for col in INDEXED_SUMS}
+
+        self._dates = {}
+        self._positions = {}
+        self._prefix = {}
+
+        for code, level in enumerate(self.levels):
+            rows = np.flatnonzero(codes == code)
+            rows = rows[np.argsort(dates[rows], kind="stable")]
+
+            self._positions[level] = rows
+            self._dates[level] = dates[rows]
+
+            prefix = {}
+            for col, v in values.items():
+                prefix[col] = np.concatenate([[0.0], np.cumsum(np.nan_to_num(v[rows]))])
+            prefix["demand_count"] = np.concatenate(
+                [[0], np.cumsum(~np.isnan(values["demand"][rows]))]
+            )
+            self._prefix[level] = prefix
+
+    def _bounds(self, start, end, severities):
+        start = pd.Timestamp(start).as_unit("ns").value
+        end = pd.Timestamp(end).as_unit("ns").value
+
+        bounds = {}
+        for level in severities:
+            if level not in self._dates:
+                continue
+            dates = self._dates[level]
+            bounds[level] = (
+                int(np.searchsorted(dates, start, side="left")),
+                int(np.searchsorted(dates, end, side="right"))
+            )
+        return bounds
+
+    # --------------------------------------------------
+    # AGGREGATES
+    # --------------------------------------------------
+
+    def counts(self, start, end, severities):
+        """
+        Rows per severity level in [start, end] (0 for unselected levels)
+        """
+        bounds = self._bounds(start, end, severities)
+        return pd.Series(
+            [bounds[level][1] - bounds[level][0] if level in bounds else 0
+             for level in self.levels],
+            index=self.levels
+        )
+
+    def sums(self, start, end, severities):
+        """
+        Row count and INDEXED_SUMS totals over [start, end] and `severities`
+        """
+        totals = {col: 0.0 for col in INDEXED_SUMS}
+        totals["demand_count"] = 0
+        totals["rows"] = 0
+
+        for level, (lo, hi) in self._bounds(start, end, severities).items():
+            prefix = self._prefix[level]
+            for col in totals:
+                if col != "rows":
+                    totals[col] += prefix[col][hi] - prefix[col][lo]
+            totals["rows"] += hi - lo
+
+        return totals
+
+    def kpis(self, start, end, severities):
+        """
+        Dashboard KPIs: mean demand, CRITICAL rows, total cost, utilization
+        """
+        totals = self.sums(start, end, severities)
+        counts = self.counts(start, end, severities)
+
+        return {
+            "rows": totals["rows"],
+            "avg_demand": (
+                totals["demand"] / totals["demand_count"]
+                if totals["demand_count"] else np.nan
+            ),
+            "critical_days": int(counts.get("CRITICAL", 0)),
+            "total_cost": totals["total_expected_cost"],
+            "utilization": (
+                totals["demand"] / totals["estimated_capacity"]
+                if totals["rows"] else 0
+            )
+        }
+
+    # --------------------------------------------------
+    # ROW POSITIONS
+    # --------------------------------------------------
+
+    def positions(self, start, end, severities):
+        """
+        Frame positions of all matching rows, in frame order
+        """
+        bounds = self._bounds(start, end, severities)
+        if not bounds:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([
+            self._positions[level][lo:hi] for level, (lo, hi) in bounds.items()
+        ]))
+
+    def tail_positions(self, start, end, severities, n=20):
+        """
+        Positions of the last `n` matching rows in frame order, i.e. what
+        `df[mask].tail(n)` would return
+        """
+        positions = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            self._positions[level][lo:hi]
+            for level, (lo, hi) in self._bounds(start, end, severities).items()
+        ])
+        if len(positions) > n:
+            positions = np.partition(positions, len(positions) - n)[-n:]
+        return np.sort(positions)
@@ -1,9 +1,14 @@
+import numpy as np
 import pandas as pd
 from src.decision.capacity_model import estimate_capacity
+from src.decision.cost_analysis import SEVERITY_COST_WEIGHTS
 from src.decision.risk_detection import detect_capacity_risk
+from src.decision.risk_rules import SEVERITY_LEVELS, severity_codes
+from src.utils.instrumentation import instrument
 
 
 
+@instrument()
 def run_what_if_scenario(
     df,
     demand_change_pct=0.0,
@@ -37,26 +42,141 @@ def run_what_if_scenario(
     ).astype(int)
 
     return df
-def compare_scenarios(df, scenarios):
-    results = []
 
-    for name, params in scenarios.items():
-        sim_df = run_what_if_scenario(
-            df,
-            demand_change_pct=params["demand_change"],
-            resource_change=params["resource_change"]
-        )
 
-        critical_days = sim_df[
-            sim_df["simulated_risk_flag"] == 1
-        ].shape[0]
+# --------------------------------------------------
+# BROADCAST SCENARIO ENGINE
+# --------------------------------------------------
+
+# Rough bytes held per (scenario, day) cell while a chunk is evaluated
+_BYTES_PER_CELL = 64
+
+
+def _scenario_metrics(
+    demand,
+    resources,
+    demand_change,
+    resource_change,
+    tickets_per_resource,
+    buffer_ratio=1.1,
+    sla_penalty_cost=500,
+    idle_resource_cost=100,
+    memory_budget_mb=256
+):
+    """
+    Evaluate S scenarios over T days as (S, chunk) broadcasts.
+
+    Same arithmetic as `run_what_if_scenario` (rounded demand, resources
+    clipped at 1, risk when demand > capacity * buffer) plus the
+    severity-weighted SLA cost and idle cost of `calculate_expected_cost`.
+    The day axis (and, for very large grids, the scenario axis) is chunked
+    so no temporary exceeds `memory_budget_mb`.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    resources = np.asarray(resources, dtype=np.float64)
+    demand_factor = 1 + np.asarray(demand_change, dtype=np.float64)
+    resource_change = np.asarray(resource_change, dtype=np.float64)
+    tickets = np.asarray(tickets_per_resource, dtype=np.float64)
+
+    n_scenarios = len(demand_factor)
+    n_days = len(demand)
+
+    cells = max(1, int(memory_budget_mb * 2**20 // _BYTES_PER_CELL))
+    scenario_block = max(1, min(n_scenarios, cells))
+    day_block = max(1, min(n_days, cells // max(scenario_block, 1)))
+
+    weights = np.array([SEVERITY_COST_WEIGHTS[level] for level in SEVERITY_LEVELS])
+
+    risk_days = np.zeros(n_scenarios, dtype=np.int64)
+    sla_cost = np.zeros(n_scenarios)
+    idle_cost = np.zeros(n_scenarios)
+
+    for s0 in range(0, n_scenarios, scenario_block):
+        s = slice(s0, s0 + scenario_block)
+        factor = demand_factor[s, None]
+        change = resource_change[s, None]
+        rate = tickets[s, None]
+
+        for t0 in range(0, n_days, day_block):
+            t = slice(t0, t0 + day_block)
+
+            sim_demand = np.round(demand[None, t] * factor)
+            sim_capacity = np.maximum(resources[None, t] + change, 1) * rate
+            buffered = sim_capacity * buffer_ratio
 
-        results.append({
-            "Scenario": name,
-            "Critical_Days": critical_days
-        })
+            risk_days[s] += (sim_demand > buffered).sum(axis=1)
+            sla_cost[s] += weights[severity_codes(sim_demand - buffered)].sum(axis=1)
+            idle_cost[s] += np.maximum(sim_capacity - sim_demand, 0).sum(axis=1)
+
+    sla_cost *= sla_penalty_cost
+    idle_cost *= idle_resource_cost
+
+    return risk_days, sla_cost, idle_cost
+
+
+@instrument()
+def evaluate_scenario_grid(
+    df,
+    demand_changes=np.linspace(-0.3, 0.5, 81),
+    resource_changes=np.arange(-5, 11),
+    tickets_per_resource=(6,),
+    buffer_ratio=1.1,
+    sla_penalty_cost=500,
+    idle_resource_cost=100,
+    memory_budget_mb=256
+):
+    """
+    Risk days and expected cost for every (demand_change, resource_change,
+    tickets_per_resource) combination, in one broadcast computation over
+    the demand and resource columns (all rows / series pooled).
+    Returns one tidy row per scenario.
+    """
+    # resource_change keeps the caller's dtype (whole or fractional staff)
+    d, r, t = np.meshgrid(
+        np.asarray(demand_changes, dtype=np.float64),
+        np.asarray(resource_changes),
+        np.asarray(tickets_per_resource, dtype=np.float64),
+        indexing="ij"
+    )
+    d, r, t = d.ravel(), r.ravel(), t.ravel()
+
+    risk_days, sla_cost, idle_cost = _scenario_metrics(
+        df["demand"].to_numpy(),
+        df["active_resources"].to_numpy(),
+        d, r, t,
+        buffer_ratio=buffer_ratio,
+        sla_penalty_cost=sla_penalty_cost,
+        idle_resource_cost=idle_resource_cost,
+        memory_budget_mb=memory_budget_mb
+    )
+
+    return pd.DataFrame({
+        "demand_change": d,
+        "resource_change": r,
+        "tickets_per_resource": t,
+        "risk_days": risk_days,
+        "sla_cost": sla_cost,
+        "idle_cost": idle_cost,
+        "total_cost": sla_cost + idle_cost
+    })
+
+
+def compare_scenarios(df, scenarios):
+    names = list(scenarios)
+    params = [scenarios[name] for name in names]
+
+    risk_days, _, _ = _scenario_metrics(
+        df["demand"].to_numpy(),
+        df["active_resources"].to_numpy(),
+        [p["demand_change"] for p in params],
+        [p["resource_change"] for p in params],
+        [6] * len(params)
+    )
 
-    return pd.DataFrame(results)
+    return pd.DataFrame({
+        "Scenario": names,
+        "Critical_Days": risk_days
+    })
 
 def backtest_resource_decision(
     df,
@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+
+from src.features.feature_engineering import series_layout
+
+HISTORY_DAYS = 14
+
+# Re-derive the running sums from the ring buffer every N days per series
+# so float demand cannot accumulate drift
+RESYNC_EVERY = 1024
+
+FEATURE_COLUMNS = [
+    "demand_lag_1",
+    "demand_lag_7",
+    "demand_lag_14",
+    "rolling_mean_7",
+    "rolling_std_7",
+    "rolling_mean_14"
+]
+
+
+class IncrementalFeatureState:
+    """
+    Per-series feature state for appending new days in O(1).
+
+    Keeps the last 14 demand values of every series in a ring buffer plus
+    running sums for the 7/14-day windows. Appending a day returns the same
+    feature row `create_time_series_features` would produce for it, without
+    touching the rest of the history. Rows are only emitted once a series
+    has 14 prior days, exactly like the batch `dropna`.
+    """
+
+    def __init__(self, series_ids=()):
+        self.series_ids = []
+        self._index = {}
+
+        self.history = np.zeros((0, HISTORY_DAYS))
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sum_7 = np.zeros(0)
+        self.sumsq_7 = np.zeros(0)
+        self.sum_14 = np.zeros(0)
+        self.last_date = np.zeros(0, dtype="datetime64[ns]")
+
+        self._register(list(series_ids))
+
+    # --------------------------------------------------
+    # SERIES BOOKKEEPING
+    # --------------------------------------------------
+
+    def _register(self, new_ids):
+        new_ids = [sid for sid in dict.fromkeys(new_ids) if sid not in self._index]
+        if not new_ids:
+            return
+
+        for sid in new_ids:
+            self._index[sid] = len(self.series_ids)
+            self.series_ids.append(sid)
+
+        n = len(new_ids)
+        self.history = np.vstack([self.history, np.zeros((n, HISTORY_DAYS))])
+        self.count = np.concatenate([self.count, np.zeros(n, dtype=np.int64)])
+        self.sum_7 = np.concatenate([self.sum_7, np.zeros(n)])
+        self.sumsq_7 = np.concatenate([self.sumsq_7, np.zeros(n)])
+        self.sum_14 = np.concatenate([self.sum_14, np.zeros(n)])
+        self.last_date = np.concatenate([
+            self.last_date,
+            np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+        ])
+
+    def _series_index(self, rows, series_col):
+        if series_col is None:
+            self._register([0])
+            return np.zeros(len(rows), dtype=np.int64)
+
+        ids = rows[series_col].tolist()
+        self._register(ids)
+        return np.array([self._index[sid] for sid in ids], dtype=np.int64)
+
+    def _check_order(self, rows, dates, series_col):
+        """
+        Raise unless every row is later than both the stored state and the
+        previous row of its series in the (date-sorted) batch
+        """
+        ids = [0] * len(rows) if series_col is None else rows[series_col].tolist()
+        known = np.array([self._index.get(sid, -1) for sid in ids], dtype=np.int64)
+
+        previous = np.full(len(rows), np.datetime64("NaT"), dtype="datetime64[ns]")
+        previous[known >= 0] = self.last_date[known[known >= 0]]
+
+        codes = pd.factorize(pd.Series(ids, dtype=object))[0]
+        in_batch = pd.Series(dates).groupby(codes).shift().to_numpy()
+        has_prior = ~np.isnat(in_batch)
+        previous[has_prior] = in_batch[has_prior]
+
+        if (~np.isnat(previous) & (dates <= previous)).any():
+            raise ValueError(
+                "New observations must be later than the stored state"
+            )
+
+    def _resync(self, s):
+        """
+        Recompute the running sums of series `s` from the ring buffer
+        """
+        count = self.count[s]
+        slots = (count[:, None] - 1 - np.arange(HISTORY_DAYS)) % HISTORY_DAYS
+        recent = np.take_along_axis(self.history[s], slots, axis=1)
+
+        self.sum_7[s] = recent[:, :7].sum(axis=1)
+        self.sumsq_7[s] = (recent[:, :7] ** 2).sum(axis=1)
+        self.sum_14[s] = recent.sum(axis=1)
+
+    # --------------------------------------------------
+    # BUILD / APPEND
+    # --------------------------------------------------
+
+    @classmethod
+    def from_history(cls, df, series_col=None):
+        """
+        Seed the state from existing raw history (only the last 14 days of
+        each series are kept)
+        """
+        state = cls()
+
+        dates = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[ns]")
+        if series_col is None:
+            codes = np.zeros(len(df), dtype=np.int64)
+            ids = [0]
+        else:
+            codes, uniques = pd.factorize(df[series_col])
+            ids = list(uniques)
+
+        order = np.lexsort((dates, codes))
+        codes = codes[order]
+        dates = dates[order]
+        demand = df["demand"].to_numpy(dtype=np.float64)[order]
+
+        starts, lengths, position = series_layout(codes)
+        state._register([ids[c] for c in codes[starts]])
+        s = np.array(
+            [state._index[ids[c]] for c in codes[starts]], dtype=np.int64
+        )
+
+        remaining = np.repeat(lengths, lengths) - position
+        recent = remaining <= HISTORY_DAYS
+        row_series = np.repeat(s, lengths)
+
+        state.history[row_series[recent], position[recent] % HISTORY_DAYS] = (
+            demand[recent]
+        )
+        state.count[s] = lengths
+        state.last_date[s] = dates[starts + lengths - 1]
+        state._resync(s)
+
+        return state
+
+    def append(self, rows, series_col=None):
+        """
+        Append new observations and return their feature rows.
+
+        `rows` is a DataFrame (or a single dict) shaped like
+        `demand_data.csv`. Each series' new days must be later than anything
+        already seen for that series. Rows whose series has fewer than 14
+        prior days are absorbed into the state but not returned.
+        """
+        if isinstance(rows, dict):
+            rows = pd.DataFrame([rows])
+
+        rows = rows.copy()
+        rows["date"] = pd.to_datetime(rows["date"])
+        rows = rows.sort_values("date", kind="stable").reset_index(drop=True)
+
+        dates = rows["date"].to_numpy().astype("datetime64[ns]")
+        demand = rows["demand"].to_numpy(dtype=np.float64)
+
+        # Validate the whole batch before any series is registered or updated
+        self._check_order(rows, dates, series_col)
+
+        s_all = self._series_index(rows, series_col)
+
+        # Several days of one series are applied in date order, one "round"
+        # per day, each round vectorized across series
+        rounds = pd.Series(s_all).groupby(s_all).cumcount().to_numpy()
+
+        features = np.full((len(rows), len(FEATURE_COLUMNS)), np.nan)
+        emitted = np.zeros(len(rows), dtype=bool)
+
+        for r in range(rounds.max() + 1 if len(rows) else 0):
+            idx = np.flatnonzero(rounds == r)
+            s = s_all[idx]
+            x = demand[idx]
+
+            count = self.count[s]
+            head = count % HISTORY_DAYS
+            lag_1 = self.history[s, (head - 1) % HISTORY_DAYS]
+            lag_7 = self.history[s, (head - 7) % HISTORY_DAYS]
+            lag_14 = self.history[s, head]
+
+            self.sum_7[s] += x - np.where(count >= 7, lag_7, 0.0)
+            self.sumsq_7[s] += x * x - np.where(count >= 7, lag_7 * lag_7, 0.0)
+            self.sum_14[s] += x - np.where(count >= 14, lag_14, 0.0)
+
+            self.history[s, head] = x
+            self.count[s] = count + 1
+            self.last_date[s] = dates[idx]
+
+            resync = s[(count + 1) % RESYNC_EVERY == 0]
+            if len(resync):
+                self._resync(resync)
+
+            var_7 = (self.sumsq_7[s] - self.sum_7[s] ** 2 / 7) / 6
+
+            features[idx] = np.column_stack([
+                lag_1,
+                lag_7,
+                lag_14,
+                self.sum_7[s] / 7,
+                np.sqrt(np.maximum(var_7, 0)),
+                self.sum_14[s] / 14
+            ])
+            emitted[idx] = count >= HISTORY_DAYS
+
+        out = rows[emitted].reset_index(drop=True)
+        for j, col in enumerate(FEATURE_COLUMNS):
+            out[col] = features[emitted, j]
+
+        return out
+
+    # --------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------
+
+    def save(self, path):
+        np.savez(
+            path,
+            series_ids=np.asarray(self.series_ids),
+            history=self.history,
+            count=self.count,
+            sum_7=self.sum_7,
+            sumsq_7=self.sumsq_7,
+            sum_14=self.sum_14,
+            last_date=self.last_date
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            state = cls(data["series_ids"].tolist())
+            state.history = data["history"].copy()
+            state.count = data["count"].copy()
+            state.sum_7 = data["sum_7"].copy()
+            state.sumsq_7 = data["sumsq_7"].copy()
+            state.sum_14 = data["sum_14"].copy()
+            state.last_date = data["last_date"].copy()
+
+        return state
+
+
+if __name__ == "__main__":
+    df = pd.read_csv("data/raw/demand_data.csv")
+
+    state = IncrementalFeatureState.from_history(df.iloc[:-1])
+    state.save("data/processed/feature_state.npz")
+
+    state = IncrementalFeatureState.load("data/processed/feature_state.npz")
+    print(state.append(df.iloc[-1].to_dict()).T)
@@ -0,0 +1,184 @@
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.dummy import DummyRegressor
+
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "value", "roots"]
+
+
+def compile_gradient_boosting(model):
+    """
+    Flatten a fitted GradientBoostingRegressor into contiguous arrays.
+
+    All trees share one node table: `feature` / `threshold` / `left` /
+    `right` / `value` per node and the root index of every tree in `roots`.
+    Leaves point to themselves, so every tree can be walked a fixed
+    `max_depth` steps without branching on "is this a leaf".
+
+    The initial prediction is stored as one constant, so only the default
+    DummyRegressor init (or init="zero") is supported; any other init
+    estimator depends on the row and raises ValueError.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+
+    sizes = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+
+    feature, threshold, left, right, value = [], [], [], [], []
+    for root, tree in zip(roots, trees):
+        own = np.arange(tree.node_count) + root
+        is_leaf = tree.children_left < 0
+
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(is_leaf, own, tree.children_left + root))
+        right.append(np.where(is_leaf, own, tree.children_right + root))
+        value.append(tree.value[:, 0, 0])
+
+    n_features = model.n_features_in_
+    if isinstance(model.init_, str) and model.init_ == "zero":
+        init = 0.0
+    elif isinstance(model.init_, DummyRegressor):
+        init = float(model.init_.predict(np.zeros((1, n_features)))[0])
+    else:
+        raise ValueError(
+            f"Cannot compile a model with init={type(model.init_).__name__}; "
+            "only DummyRegressor or 'zero' inits are constant"
+        )
+
+    arrays = {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": roots
+    }
+    meta = {
+        "init": init,
+        "learning_rate": float(model.learning_rate),
+        "max_depth": int(max(tree.max_depth for tree in trees)),
+        "n_features": int(n_features),
+        "feature_names": [str(f) for f in getattr(model, "feature_names_in_", [])]
+    }
+
+    return CompiledGradientBoosting(arrays, meta, estimator=model)
+
+
+class CompiledGradientBoosting:
+    """
+    Vectorized predictor over a flattened tree ensemble.
+
+    Walks all trees for a block of rows at once, `max_depth` gather steps
+    over an (n_rows, n_trees) node-index matrix, and sums the stages in the
+    same order as sklearn, so predictions are identical to `model.predict`.
+    No input validation is done beyond column selection, which keeps
+    single-row and small-batch calls far cheaper than sklearn.
+
+    sklearn's compiled traversal is still faster per row on large batches,
+    so when the source `estimator` is attached (as after
+    `compile_gradient_boosting`) batches above `batch_rows` are handed to it.
+    """
+
+    # Rows per traversal block; keeps the node matrix cache-resident
+    BLOCK_ROWS = 512
+
+    def __init__(self, arrays, meta, estimator=None, batch_rows=128):
+        self.arrays = arrays
+        self.meta = meta
+        self.estimator = estimator
+        self.batch_rows = batch_rows
+
+        self._feature = np.asarray(arrays["feature"], dtype=np.int32)
+        self._threshold = arrays["threshold"]
+        self._left = np.asarray(arrays["left"], dtype=np.int32)
+        self._right = np.asarray(arrays["right"], dtype=np.int32)
+        self._value = arrays["value"]
+        self._roots = np.asarray(arrays["roots"], dtype=np.int32)
+
+        self._init = meta["init"]
+        self._learning_rate = meta["learning_rate"]
+        self._depth = meta["max_depth"]
+        self.feature_names_in_ = meta["feature_names"] or None
+        self.n_features_in_ = meta["n_features"]
+
+    def predict(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, "columns"):
+            X = X[self.feature_names_in_]
+
+        if self.estimator is not None and len(X) > self.batch_rows:
+            return self.estimator.predict(X)
+
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        out = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], self.BLOCK_ROWS):
+            block = slice(start, start + self.BLOCK_ROWS)
+            out[block] = self._predict_block(X[block])
+        return out
+
+    def _predict_block(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        node = np.broadcast_to(self._roots, (n_rows, len(self._roots)))
+
+        for _ in range(self._depth):
+            x = np.take(flat, row_base + np.take(self._feature, node))
+            node = np.where(
+                x <= np.take(self._threshold, node),
+                np.take(self._left, node),
+                np.take(self._right, node)
+            )
+
+        # init + lr * v_1 + lr * v_2 + ..., accumulated left to right like
+        # sklearn's predict_stages
+        stages = np.empty((n_rows, len(self._roots) + 1))
+        stages[:, 0] = self._init
+        np.multiply(np.take(self._value, node), self._learning_rate, out=stages[:, 1:])
+
+        return np.cumsum(stages, axis=1)[:, -1]
+
+    # --------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------
+
+    def save(self, path):
+        """
+        Save as a directory of .npy arrays plus meta.json (mmap-friendly)
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), self.arrays[name])
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True, estimator=None):
+        """
+        Load a compiled model; with `mmap=True` the node arrays are
+        memory-mapped read-only, so processes share the same pages
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(
+                os.path.join(path, f"{name}.npy"),
+                mmap_mode="r" if mmap else None
+            )
+            for name in ARRAY_NAMES
+        }
+        return cls(arrays, meta, estimator=estimator)
+
+
+if __name__ == "__main__":
+    from src.models.registry import LEGACY_MODEL_PATH
+
+    model = joblib.load(LEGACY_MODEL_PATH)
+    compile_gradient_boosting(model).save("models/demand_forecast_model_compiled")
+    print("✅ Compiled model saved")
@@ -0,0 +1,243 @@
+import heapq
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def conformal_rank(n, confidence):
+    """
+    1-based rank of the split-conformal quantile among n scores:
+    ceil((n + 1) * confidence), capped at n
+    """
+    return min(math.ceil((n + 1) * confidence), n)
+
+
+class SlidingQuantile:
+    """
+    Conformal quantile of the last `window` values, updated in O(log w).
+
+    Two heaps split the window: `_low` (a max-heap, stored negated) holds
+    the `conformal_rank` smallest values and `_high` the rest, so the
+    quantile is the top of `_low`. Values leaving the window are not
+    searched for; they are counted in a per-heap "deleted" map and dropped
+    when they reach a heap top (lazy deletion). Dead entries that never
+    surface (e.g. old minima deep in `_low`) are swept out by rebuilding a
+    heap once they outnumber its live values, so each heap stays O(w).
+    """
+
+    def __init__(self, confidence, window):
+        self.confidence = confidence
+        self.window = window
+
+        self._values = deque()
+        self._low, self._high = [], []
+        self._low_size = 0
+        self._low_deleted, self._high_deleted = {}, {}
+        self._low_dead = self._high_dead = 0
+        self._full_rank = conformal_rank(window, confidence)
+
+    def __len__(self):
+        return len(self._values)
+
+    @staticmethod
+    def _prune(heap, deleted, sign):
+        """
+        Pop dead entries off the top of `heap`; returns how many
+        """
+        popped = 0
+        while heap:
+            value = sign * heap[0]
+            count = deleted.get(value)
+            if not count:
+                break
+            heapq.heappop(heap)
+            popped += 1
+            if count == 1:
+                del deleted[value]
+            else:
+                deleted[value] = count - 1
+        return popped
+
+    @staticmethod
+    def _compact(heap, deleted, sign):
+        """
+        `heap` without its dead entries, re-heapified; empties `deleted`
+        """
+        live = []
+        for item in heap:
+            value = sign * item
+            count = deleted.get(value)
+            if count:
+                deleted[value] = count - 1
+            else:
+                live.append(item)
+        deleted.clear()
+        heapq.heapify(live)
+        return live
+
+    def _low_top(self):
+        if self._low_deleted:
+            self._low_dead -= self._prune(self._low, self._low_deleted, -1)
+        return -self._low[0]
+
+    def _high_top(self):
+        if self._high_deleted:
+            self._high_dead -= self._prune(self._high, self._high_deleted, 1)
+        return self._high[0]
+
+    def push(self, value):
+        values = self._values
+        values.append(value)
+
+        if self._low_size and value <= self._low_top():
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+
+        if len(values) > self.window:
+            old = values.popleft()
+            # Every value in _low is <= every value in _high; an old value
+            # equal to the low top may sit in either heap, and removing a
+            # copy from _low leaves the same multiset
+            if old <= self._low_top():
+                self._low_deleted[old] = self._low_deleted.get(old, 0) + 1
+                self._low_dead += 1
+                self._low_size -= 1
+                if self._low_dead > self._low_size:
+                    self._low = self._compact(self._low, self._low_deleted, -1)
+                    self._low_dead = 0
+            else:
+                self._high_deleted[old] = self._high_deleted.get(old, 0) + 1
+                self._high_dead += 1
+                if self._high_dead > len(values) - self._low_size:
+                    self._high = self._compact(self._high, self._high_deleted, 1)
+                    self._high_dead = 0
+            target = self._full_rank
+        else:
+            target = conformal_rank(len(values), self.confidence)
+
+        # Move heap tops until _low holds exactly `target` live values
+        while self._low_size > target:
+            heapq.heappush(self._high, self._low_top())
+            heapq.heappop(self._low)
+            self._low_size -= 1
+
+        while self._low_size < target:
+            heapq.heappush(self._low, -self._high_top())
+            heapq.heappop(self._high)
+            self._low_size += 1
+
+    def value(self):
+        if not self._values:
+            return np.nan
+        return self._low_top()
+
+
+# --------------------------------------------------
+# ROLLING INTERVALS
+# --------------------------------------------------
+
+def _release_quantiles(values, group_start, window, confidence):
+    """
+    Conformal quantile of values[max(group_start[i], i - window + 1):i + 1]
+    for every position i: each group's values are pushed, in order, into
+    its own SlidingQuantile, O(log w) per value.
+    """
+    out = np.empty(len(values))
+    tracker = None
+    for i, (value, start) in enumerate(zip(values.tolist(), group_start.tolist())):
+        if start == i:
+            tracker = SlidingQuantile(confidence, window)
+        tracker.push(value)
+        out[i] = tracker.value()
+    return out
+
+
+def rolling_conformal_width(scores, dates, groups, horizons, confidence=0.9,
+                            window=90):
+    """
+    Interval half-width for every row from the scores (absolute
+    residuals) of earlier rows of the same group.
+
+    A row forecast `h` days ahead only uses residuals whose actuals were
+    known when the forecast was made, i.e. target date <= date - h.
+    Rows without any usable residual get NaN.
+
+    The non-missing scores are sorted by (group, date) and streamed through
+    one SlidingQuantile per group, giving the quantile after each release
+    in O(log w); every row then looks up how many of its group's scores
+    were released by its forecast origin with one vectorized searchsorted
+    across all groups and horizons.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    dates_ns = np.asarray(dates, dtype="datetime64[ns]").view(np.int64)
+    codes = pd.factorize(np.asarray(groups))[0]
+    horizons = np.asarray(horizons, dtype=np.int64)
+    day_ns = 86_400 * 10**9
+
+    order = np.lexsort((dates_ns, codes))
+    codes = codes[order]
+    valid = ~np.isnan(scores[order])
+
+    # Released scores, in (group, date) order, with their group's start
+    valid_codes = codes[valid]
+    group_start = np.searchsorted(valid_codes, valid_codes, side="left")
+    quantiles = _release_quantiles(
+        scores[order][valid], group_start, window, confidence
+    )
+
+    # One sortable key per (group, date): group * (dates + 1) + date rank
+    unique_dates = np.unique(dates_ns)
+    stride = len(unique_dates) + 1
+    date_rank = np.searchsorted(unique_dates, dates_ns[order])
+    known_rank = np.searchsorted(
+        unique_dates, (dates_ns - horizons * day_ns)[order], side="right"
+    )
+    valid_keys = valid_codes * stride + date_rank[valid] + 1
+    released = np.searchsorted(valid_keys, codes * stride + known_rank, side="right")
+
+    # Only scores of rows before this one are released (as for h = 0 ties),
+    # and a release is never taken back
+    first = np.searchsorted(valid_codes, codes, side="left")
+    released = np.minimum(released, np.cumsum(valid) - valid)
+    released = np.maximum.accumulate(np.maximum(released, first))
+
+    width = np.full(len(scores), np.nan)
+    has = released > first
+    width[order[has]] = quantiles[released[has] - 1]
+    return width
+
+
+def add_conformal_bounds(df, confidence=0.9, window=90, series_col=None,
+                         horizon_col=None):
+    """
+    Add forecast_lower / forecast_upper from rolling conformal quantiles of
+    |demand - forecast|, per series and per forecast horizon. Without
+    `horizon_col` every row is a one-day-ahead forecast.
+    """
+    df = df.copy()
+
+    scores = (df["demand"] - df["forecast"]).abs()
+    if horizon_col is None:
+        horizons = np.ones(len(df), dtype=np.int64)
+    else:
+        horizons = df[horizon_col].to_numpy(dtype=np.int64)
+
+    series = (
+        np.zeros(len(df), dtype=np.int64) if series_col is None
+        else pd.factorize(df[series_col])[0]
+    )
+    # One quantile structure per (series, horizon)
+    groups = series * (horizons.max(initial=1) + 1) + horizons
+
+    width = rolling_conformal_width(
+        scores, pd.to_datetime(df["date"]), groups, horizons, confidence, window
+    )
+
+    df["forecast_lower"] = df["forecast"] - width
+    df["forecast_upper"] = df["forecast"] + width
+
+    return df
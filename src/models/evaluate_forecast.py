@@ -1,42 +1,80 @@
-import pandas as pd
+from statistics import NormalDist
+
 import numpy as np
-import joblib
-from sklearn.metrics import mean_absolute_error
-
-
-def forecast_with_uncertainty(df, confidence=0.9):
-    model = joblib.load("models/demand_forecast_model.pkl")
-
-    features = [
-        "demand_lag_1",
-        "demand_lag_7",
-        "demand_lag_14",
-        "rolling_mean_7",
-        "rolling_std_7",
-        "rolling_mean_14",
-        "day_of_week",
-        "is_weekend",
-        "avg_resolution_time",
-        "active_resources",
-        "backlog",
-        "demand_growth_rate"
-    ]
+
+from src.data.load_data import load_feature_data
+from src.models.conformal import add_conformal_bounds
+from src.models.registry import load_model
+from src.utils.instrumentation import instrument
+
+FEATURES = [
+    "demand_lag_1",
+    "demand_lag_7",
+    "demand_lag_14",
+    "rolling_mean_7",
+    "rolling_std_7",
+    "rolling_mean_14",
+    "day_of_week",
+    "is_weekend",
+    "avg_resolution_time",
+    "active_resources",
+    "backlog",
+    "demand_growth_rate"
+]
+
+
+def add_uncertainty_bounds(df, residual_std, confidence=0.9):
+    """
+    Add forecast_lower / forecast_upper around an existing forecast column
+    (two-sided normal interval at `confidence`)
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    df["forecast_lower"] = df["forecast"] - z * residual_std
+    df["forecast_upper"] = df["forecast"] + z * residual_std
+
+    return df
+
+
+def forecast_residuals(df):
+    """
+    In-sample forecast errors (actual - forecast), e.g. for simulation
+    """
+    return (df["demand"] - df["forecast"]).to_numpy(dtype=np.float64)
+
+
+@instrument()
+def forecast_with_uncertainty(df, confidence=0.9, model=None, method="normal",
+                              window=90, series_col=None):
+    """
+    Forecast with an interval: "normal" uses the in-sample residual std,
+    "conformal" rolling per-series residual quantiles over `window` days
+    (rows without earlier residuals fall back to the normal interval)
+    """
+    if model is None:
+        model = load_model()
 
     df = df.copy()
-    df["forecast"] = model.predict(df[features])
+    df["forecast"] = model.predict(df[FEATURES])
 
     # Estimate residual error
     residual_std = np.std(df["demand"] - df["forecast"])
 
-    z = 1.65 if confidence == 0.9 else 1.96
+    if method == "normal":
+        return add_uncertainty_bounds(df, residual_std, confidence)
 
-    df["forecast_lower"] = df["forecast"] - z * residual_std
-    df["forecast_upper"] = df["forecast"] + z * residual_std
+    if method != "conformal":
+        raise ValueError(f"Unknown interval method: {method}")
+
+    normal = add_uncertainty_bounds(df.copy(), residual_std, confidence)
+    df = add_conformal_bounds(df, confidence, window, series_col)
+    for col in ["forecast_lower", "forecast_upper"]:
+        df[col] = df[col].fillna(normal[col])
 
     return df
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("data/processed/forecast_features.csv")
+    df = load_feature_data()
     df = forecast_with_uncertainty(df)
     print(df[["forecast", "forecast_lower", "forecast_upper"]].tail())
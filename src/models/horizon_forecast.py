@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from src.data.load_data import load_demand_data
+from src.features.feature_engineering import series_layout
+from src.models.evaluate_forecast import FEATURES
+from src.models.registry import load_model
+
+HISTORY_DAYS = 14
+
+# Exogenous columns held at each series' last observed value
+EXOGENOUS_COLUMNS = ["avg_resolution_time", "active_resources"]
+
+
+def _last_values(df, series_col):
+    """
+    Last HISTORY_DAYS demand values (oldest first), last exogenous values
+    and last date of every series
+    """
+    if series_col is None:
+        codes = np.zeros(len(df), dtype=np.int64)
+        series_ids = np.array([None], dtype=object)
+    else:
+        codes, series_ids = pd.factorize(df[series_col], sort=True)
+
+    dates = df["date"].to_numpy(dtype="datetime64[ns]")
+    order = np.lexsort((dates, codes))
+    codes = codes[order]
+
+    starts, lengths, _ = series_layout(codes)
+    if len(lengths) and lengths.min() < HISTORY_DAYS:
+        raise ValueError(
+            f"Every series needs at least {HISTORY_DAYS} days of history"
+        )
+
+    ends = starts + lengths
+    window = order[ends[:, None] - HISTORY_DAYS + np.arange(HISTORY_DAYS)]
+    last = order[ends - 1]
+
+    demand = df["demand"].to_numpy(dtype=np.float64)
+    exog = {col: df[col].to_numpy(dtype=np.float64)[last] for col in EXOGENOUS_COLUMNS}
+
+    return series_ids, demand[window], exog, dates[last]
+
+
+def _feature_matrix(buf, t, guess, day_of_week, exog, tickets_per_resource):
+    """
+    Model inputs for step `t` of every series, with `guess` standing in for
+    the not-yet-known demand of that day (the rolling windows include it)
+    """
+    prev_6 = buf[:, t + 8:t + HISTORY_DAYS]
+    prev_13 = buf[:, t + 1:t + HISTORY_DAYS]
+    lag_1 = buf[:, t + HISTORY_DAYS - 1]
+
+    mean_7 = (prev_6.sum(axis=1) + guess) / 7
+    var_7 = (
+        ((prev_6 - mean_7[:, None]) ** 2).sum(axis=1) + (guess - mean_7) ** 2
+    ) / 6
+
+    # Growth rate is 0 where undefined, like the fillna(0) of the batch
+    # features, so a prediction clipped to 0 never feeds inf forward
+    defined = lag_1 != 0
+
+    cols = {
+        "demand_lag_1": lag_1,
+        "demand_lag_7": buf[:, t + 7],
+        "demand_lag_14": buf[:, t],
+        "rolling_mean_7": mean_7,
+        "rolling_std_7": np.sqrt(var_7),
+        "rolling_mean_14": (prev_13.sum(axis=1) + guess) / 14,
+        "day_of_week": day_of_week,
+        "is_weekend": day_of_week >= 5,
+        "avg_resolution_time": exog["avg_resolution_time"],
+        "active_resources": exog["active_resources"],
+        "backlog": np.maximum(
+            guess - exog["active_resources"] * tickets_per_resource, 0
+        ),
+        "demand_growth_rate": np.where(
+            defined, guess / np.where(defined, lag_1, 1.0) - 1, 0.0
+        )
+    }
+
+    # Assembled by name, so the column order always follows FEATURES
+    n = len(buf)
+    return np.column_stack([
+        np.broadcast_to(np.asarray(cols[f], dtype=np.float64), n) for f in FEATURES
+    ])
+
+
+def recursive_forecast(
+    history,
+    horizon=90,
+    model=None,
+    series_col=None,
+    refine_steps=1,
+    tickets_per_resource=6
+):
+    """
+    Forecast `horizon` days ahead for every series by feeding predictions
+    back into the lag and rolling features.
+
+    State is one (n_series, 14 + horizon) demand array: each step reads the
+    trailing 14 columns, predicts all series with a single `predict` call
+    and writes the result into the next column. The rolling features,
+    backlog and growth rate include the day being forecast, so each step
+    starts from lag_1 as the guess and re-predicts `refine_steps` times
+    with the previous prediction substituted. Exogenous columns are held
+    at their last observed values.
+    """
+    if model is None:
+        model = load_model()
+
+    series_ids, window, exog, last_dates = _last_values(history, series_col)
+    n_series = len(series_ids)
+
+    buf = np.empty((n_series, HISTORY_DAYS + horizon))
+    buf[:, :HISTORY_DAYS] = window
+
+    first_day = last_dates + np.timedelta64(1, "D")
+    first_dow = pd.DatetimeIndex(first_day).dayofweek.to_numpy()
+
+    for t in range(horizon):
+        day_of_week = (first_dow + t) % 7
+        guess = buf[:, t + HISTORY_DAYS - 1]
+
+        for _ in range(refine_steps + 1):
+            X = _feature_matrix(
+                buf, t, guess, day_of_week, exog, tickets_per_resource
+            )
+            guess = np.maximum(
+                model.predict(pd.DataFrame(X, columns=FEATURES, copy=False)), 0
+            )
+
+        buf[:, t + HISTORY_DAYS] = guess
+
+    steps = np.arange(1, horizon + 1)
+    result = pd.DataFrame({
+        "date": (
+            last_dates[:, None] + steps * np.timedelta64(1, "D")
+        ).ravel(),
+        "horizon": np.tile(steps, n_series),
+        "forecast": buf[:, HISTORY_DAYS:].ravel()
+    })
+    if series_col is not None:
+        result.insert(0, series_col, np.repeat(series_ids, horizon))
+
+    return result
+
+
+if __name__ == "__main__":
+    df = load_demand_data()
+    forecast = recursive_forecast(df, horizon=30)
+    print(forecast.head(10))
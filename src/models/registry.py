@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+
+from src.models.compiled_predictor import (
+    CompiledGradientBoosting,
+    compile_gradient_boosting
+)
+from src.utils.instrumentation import record_cache
+
+REGISTRY_DIR = "models/registry"
+LEGACY_MODEL_PATH = "models/demand_forecast_model.pkl"
+
+ACTIVE_FILE = "ACTIVE"
+
+# Loaded models kept per process
+MAX_LOADED_MODELS = 4
+
+# How often (seconds) the ACTIVE pointer is re-checked for a hot swap
+ACTIVE_CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_loaded = OrderedDict()
+_active = {}
+
+
+# --------------------------------------------------
+# VERSIONING
+# --------------------------------------------------
+
+def model_version(train_df, params):
+    """
+    Content hash of the training data and the model parameters
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        pd.util.hash_pandas_object(train_df, index=False).to_numpy().tobytes()
+    )
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:12]
+
+
+def register_model(model, train_df, params, registry_dir=REGISTRY_DIR,
+                   activate=True, metrics=None):
+    """
+    Store a trained model as a new immutable version and (by default)
+    make it the active one.
+
+    The version directory holds the pickled estimator, its compiled
+    node arrays (for GradientBoostingRegressor) and meta.json. It is
+    built in a temporary directory and renamed into place, so readers
+    never see a half-written version. `metrics` (e.g. the held-out
+    residual std used for uncertainty bands) is kept in meta.json.
+    """
+    version = model_version(train_df, params)
+    version_dir = os.path.join(registry_dir, version)
+    os.makedirs(registry_dir, exist_ok=True)
+
+    if not os.path.isdir(version_dir):
+        tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=registry_dir)
+
+        joblib.dump(model, os.path.join(tmp_dir, "model.pkl"))
+        if hasattr(model, "estimators_") and hasattr(model, "init_"):
+            try:
+                compiled = compile_gradient_boosting(model)
+            except ValueError:
+                # Non-constant init: served from the pickle only
+                compiled = None
+            if compiled is not None:
+                compiled.save(os.path.join(tmp_dir, "compiled"))
+
+        meta = {
+            "version": version,
+            "params": params,
+            "model_class": type(model).__name__,
+            "n_training_rows": len(train_df),
+            "metrics": metrics or {},
+            "created_at": pd.Timestamp.now().isoformat()
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2, default=str)
+
+        try:
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            # Another process registered the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if activate:
+        activate_version(version, registry_dir)
+
+    return version
+
+
+def activate_version(version, registry_dir=REGISTRY_DIR):
+    """
+    Atomically point ACTIVE at `version`; running processes pick it up
+    within ACTIVE_CHECK_INTERVAL
+    """
+    if not os.path.isdir(os.path.join(registry_dir, version)):
+        raise ValueError(f"Unknown model version: {version}")
+
+    tmp_path = os.path.join(registry_dir, f".{ACTIVE_FILE}.{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(registry_dir, ACTIVE_FILE))
+
+    with _lock:
+        _active.pop(registry_dir, None)
+
+
+def active_version(registry_dir=REGISTRY_DIR):
+    """
+    Active version, or None for an empty registry. The pointer is cached
+    in-process and only re-read when its mtime changes.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _active.get(registry_dir)
+        if cached is not None and now - cached["checked"] < ACTIVE_CHECK_INTERVAL:
+            return cached["version"]
+
+    path = os.path.join(registry_dir, ACTIVE_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if cached is not None and cached["mtime"] == mtime:
+        version = cached["version"]
+    else:
+        with open(path) as f:
+            version = f.read().strip()
+
+    with _lock:
+        _active[registry_dir] = {"version": version, "mtime": mtime, "checked": now}
+
+    return version
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+
+    versions = []
+    for name in sorted(os.listdir(registry_dir)):
+        meta_path = os.path.join(registry_dir, name, "meta.json")
+        if not name.startswith(".") and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                versions.append(json.load(f))
+    return versions
+
+
+def load_metadata(version=None, registry_dir=REGISTRY_DIR):
+    """
+    meta.json of `version` (default: the active one); {} for the legacy
+    pickle
+    """
+    if version is None:
+        version = active_version(registry_dir)
+    if version is None:
+        return {}
+
+    with open(os.path.join(registry_dir, version, "meta.json")) as f:
+        return json.load(f)
+
+
+# --------------------------------------------------
+# LOADING
+# --------------------------------------------------
+
+def load_model(version=None, registry_dir=REGISTRY_DIR, compiled=False):
+    """
+    Return a model from the process-wide LRU cache, loading it on a miss.
+
+    `version=None` follows the ACTIVE pointer (falling back to the legacy
+    pickle when the registry is empty), so a newly activated model is
+    served without a restart. `compiled=True` returns the memory-mapped
+    CompiledGradientBoosting: its node arrays are shared page-for-page by
+    every worker process on the host instead of each holding a copy, and
+    batches above its `batch_rows` go to the attached pickled estimator.
+    Versions without compiled arrays (e.g. histogram boosting) load the
+    pickled estimator either way.
+    """
+    if version is None:
+        version = active_version(registry_dir)
+
+    if version is None:
+        key = (LEGACY_MODEL_PATH, False)
+    else:
+        key = (os.path.join(registry_dir, version), compiled)
+
+    with _lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            record_cache("model_registry", True)
+            return _loaded[key]
+
+    record_cache("model_registry", False)
+
+    path, want_compiled = key
+    if path == LEGACY_MODEL_PATH:
+        model = joblib.load(LEGACY_MODEL_PATH)
+    elif want_compiled and os.path.isdir(os.path.join(path, "compiled")):
+        # The pickled estimator stays attached for large batches, where
+        # sklearn's per-tree vectorized traversal is faster
+        model = CompiledGradientBoosting.load(
+            os.path.join(path, "compiled"),
+            mmap=True,
+            estimator=joblib.load(os.path.join(path, "model.pkl"), mmap_mode="r")
+        )
+    else:
+        model = joblib.load(os.path.join(path, "model.pkl"), mmap_mode="r")
+
+    with _lock:
+        _loaded[key] = model
+        _loaded.move_to_end(key)
+        while len(_loaded) > MAX_LOADED_MODELS:
+            _loaded.popitem(last=False)
+
+    return model
+
+
+def clear_cache():
+    with _lock:
+        _loaded.clear()
+        _active.clear()
+
+
+if __name__ == "__main__":
+    for meta in list_versions():
+        marker = "*" if meta["version"] == active_version() else " "
+        print(f"{marker} {meta['version']}  {meta['created_at']}  {meta['params']}")
@@ -0,0 +1,334 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error
+from threadpoolctl import threadpool_limits
+
+from src.data.load_data import load_feature_data
+from src.models.evaluate_forecast import FEATURES
+from src.models.train_forecast_model import HIST_FIXED_PARAMS
+from src.utils.instrumentation import instrument, record_cache
+
+SEGMENT_BUNDLE_PATH = "models/segment_models.bundle"
+
+# One config for every segment; a per-segment search would multiply the
+# nightly cost by the grid size
+SEGMENT_PARAMS = {
+    **HIST_FIXED_PARAMS,
+    "max_iter": 200,
+    "learning_rate": 0.1,
+    "max_leaf_nodes": 15,
+    "min_samples_leaf": 10
+}
+
+# Segments with fewer training rows are served by the global model
+MIN_SEGMENT_ROWS = 60
+
+# Key of the all-segments model inside a bundle
+GLOBAL_KEY = "__global__"
+
+# Models kept unpickled per bundle
+MAX_LOADED_SEGMENTS = 64
+
+# Bundle layout: [pickled models...][JSON index][index length: u64][MAGIC]
+_MAGIC = b"SEGBNDL1"
+_FOOTER = struct.Struct("<Q8s")
+
+
+# --------------------------------------------------
+# TRAINING
+# --------------------------------------------------
+
+# Per-worker memory-mapped training arrays and thread limit
+_X = _y = _holdout = None
+_thread_limit = None
+
+
+def _init_segment_worker(paths, threads):
+    # Every worker memory-maps the same segment-sorted arrays once;
+    # tasks only carry row bounds
+    global _X, _y, _holdout, _thread_limit
+    _X, _y, _holdout = [np.load(path, mmap_mode="r") for path in paths]
+    _thread_limit = threadpool_limits(threads)
+
+
+def _fit_segment(task):
+    key, start, end, params = task
+
+    X, y = _X[start:end], _y[start:end]
+    test = np.asarray(_holdout[start:end])
+
+    started = time.perf_counter()
+    model = HistGradientBoostingRegressor(**params)
+    model.fit(X[~test], y[~test])
+
+    mae = None
+    if test.any():
+        mae = float(mean_absolute_error(y[test], model.predict(X[test])))
+
+    return key, pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL), {
+        "segment": key,
+        "train_rows": int((~test).sum()),
+        "test_rows": int(test.sum()),
+        "mae": mae,
+        "n_iter": int(model.n_iter_),
+        "fit_seconds": time.perf_counter() - started
+    }
+
+
+def _segment_tasks(starts, ends, keys, params, min_rows, with_global):
+    """
+    (key, start, end, params) per segment over rows sorted by segment;
+    the global model covers all rows
+    """
+    tasks = []
+    if with_global:
+        tasks.append((GLOBAL_KEY, 0, int(ends[-1]) if len(ends) else 0, params))
+    for key, start, end in zip(keys, starts, ends):
+        if end - start >= min_rows:
+            tasks.append((key, int(start), int(end), params))
+
+    # Largest fits first, so a long one never starts last
+    return sorted(tasks, key=lambda t: t[1] - t[2])
+
+
+@instrument()
+def train_segment_models(
+    df=None,
+    segment_col="series_id",
+    params=SEGMENT_PARAMS,
+    bundle_path=SEGMENT_BUNDLE_PATH,
+    with_global=True,
+    min_rows=MIN_SEGMENT_ROWS,
+    test_fraction=0.2,
+    n_workers=None,
+    threads_per_worker=1
+):
+    """
+    Fit one model per segment (plus a global fallback) in a process pool
+    and write them all to a single indexed bundle.
+
+    Rows are sorted by (segment, date) and written once to .npy files
+    that workers memory-map; every task is just a row range. At most
+    2 * n_workers fits are in flight and finished models are streamed
+    into the bundle as they arrive, so memory stays flat however many
+    segments there are. Each segment holds out its last `test_fraction`
+    of dates for MAE, like `train_forecast_model`; the global model
+    trains and tests on the union of those splits.
+
+    Returns a per-segment metrics frame.
+    """
+    target = "demand"
+    if df is None:
+        df = load_feature_data(columns=["date", segment_col] + FEATURES + [target])
+
+    df = df.dropna(subset=FEATURES + [target])
+    codes, segments = pd.factorize(df[segment_col], sort=True)
+
+    # Bundle keys are strings (the index is JSON); distinct segments must
+    # stay distinct, e.g. 1 and "1" cannot share one model
+    keys = [str(segment) for segment in segments]
+    if len(set(keys)) < len(keys) or GLOBAL_KEY in keys:
+        raise ValueError(
+            f"Values of '{segment_col}' collide as bundle keys once converted "
+            f"to strings (or use the reserved key {GLOBAL_KEY!r})"
+        )
+    order = np.lexsort((df["date"].to_numpy(), codes))
+    codes = codes[order]
+
+    # Per-segment holdout: the last test_fraction of each segment's dates
+    starts = np.searchsorted(codes, np.arange(len(segments)), side="left")
+    ends = np.searchsorted(codes, np.arange(len(segments)), side="right")
+    lengths = ends - starts
+    position = np.arange(len(codes)) - np.repeat(starts, lengths)
+    n_train = lengths - (lengths * test_fraction).astype(np.int64)
+    holdout = position >= np.repeat(n_train, lengths)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    tasks = _segment_tasks(starts, ends, keys, params, min_rows, with_global)
+
+    os.makedirs(os.path.dirname(bundle_path) or ".", exist_ok=True)
+    bundle_dir = os.path.dirname(os.path.abspath(bundle_path))
+
+    results = []
+    index = {"segment_col": segment_col, "features": FEATURES, "models": {}}
+
+    with tempfile.TemporaryDirectory(prefix="segments-") as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"{name}.npy") for name in ["X", "y", "holdout"]]
+        np.save(paths[0], df[FEATURES].to_numpy(dtype=np.float64)[order])
+        np.save(paths[1], df[target].to_numpy(dtype=np.float64)[order])
+        np.save(paths[2], holdout)
+
+        fd, tmp_bundle = tempfile.mkstemp(prefix=".bundle-", dir=bundle_dir)
+        try:
+            with os.fdopen(fd, "wb") as out, ProcessPoolExecutor(
+                max_workers=n_workers,
+                initializer=_init_segment_worker,
+                initargs=(paths, threads_per_worker)
+            ) as pool:
+                pending = set()
+                queue = iter(tasks)
+
+                while True:
+                    for task in queue:
+                        pending.add(pool.submit(_fit_segment, task))
+                        if len(pending) >= 2 * n_workers:
+                            break
+                    if not pending:
+                        break
+
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key, blob, metrics = future.result()
+                        index["models"][key] = [out.tell(), len(blob)]
+                        out.write(blob)
+                        results.append(metrics)
+
+                index_bytes = json.dumps(index).encode()
+                out.write(index_bytes)
+                out.write(_FOOTER.pack(len(index_bytes), _MAGIC))
+
+            # Readers either see the previous bundle or the complete new one
+            os.replace(tmp_bundle, bundle_path)
+        finally:
+            if os.path.exists(tmp_bundle):
+                os.remove(tmp_bundle)
+
+    return pd.DataFrame(results).sort_values("segment").reset_index(drop=True)
+
+
+# --------------------------------------------------
+# LOADING & SCORING
+# --------------------------------------------------
+
+class SegmentBundle:
+    """
+    Read side of a segment bundle.
+
+    Opening reads only the footer and the index; the file is memory-
+    mapped and a model is unpickled the first time a row needs it, then
+    kept in a small LRU. Scoring routes rows to their segment model in
+    vectorized groups, falling back to the global model for segments
+    without one.
+    """
+
+    def __init__(self, path=SEGMENT_BUNDLE_PATH, max_loaded=MAX_LOADED_SEGMENTS):
+        self.path = path
+        self.max_loaded = max_loaded
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_len, magic = _FOOTER.unpack(self._map[-_FOOTER.size:])
+        if magic != _MAGIC:
+            raise ValueError(f"Not a segment bundle: {path}")
+        index_end = len(self._map) - _FOOTER.size
+        index = json.loads(self._map[index_end - index_len:index_end])
+
+        self.segment_col = index["segment_col"]
+        self.features = index["features"]
+        self._offsets = index["models"]
+
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def segments(self):
+        return [key for key in self._offsets if key != GLOBAL_KEY]
+
+    def __contains__(self, segment):
+        return str(segment) in self._offsets
+
+    def model(self, segment):
+        """
+        Model for `segment` (GLOBAL_KEY for the global one), loaded on
+        first use
+        """
+        key = str(segment)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                record_cache("segment_bundle", True)
+                return self._loaded[key]
+
+        record_cache("segment_bundle", False)
+        offset, length = self._offsets[key]
+        model = pickle.loads(self._map[offset:offset + length])
+
+        with self._lock:
+            self._loaded[key] = model
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return model
+
+    @instrument("segment_predict")
+    def predict(self, df, segment_col=None):
+        """
+        Forecast for every row of `df`, each by its own segment's model.
+
+        Rows are grouped once (factorize + stable argsort), every model
+        predicts its contiguous block of the feature matrix in one call,
+        and the results are scattered back into row order.
+        """
+        segment_col = segment_col or self.segment_col
+        X = df[self.features].to_numpy(dtype=np.float64)
+        codes, segments = pd.factorize(df[segment_col].astype(str))
+
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(segments) + 1))
+
+        # Segments without a model share one global-model call
+        fallback = []
+        forecast = np.empty(len(df))
+        for i, segment in enumerate(segments):
+            rows = order[bounds[i]:bounds[i + 1]]
+            if segment in self._offsets:
+                forecast[rows] = self.model(segment).predict(X[rows])
+            else:
+                fallback.append(rows)
+
+        if fallback:
+            if GLOBAL_KEY not in self._offsets:
+                raise KeyError(
+                    f"No model for {len(fallback)} segment(s) and no global model"
+                )
+            rows = np.concatenate(fallback)
+            forecast[rows] = self.model(GLOBAL_KEY).predict(X[rows])
+
+        return forecast
+
+    def close(self):
+        with self._lock:
+            self._loaded.clear()
+        self._map.close()
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    segment_col = sys.argv[1] if len(sys.argv) > 1 else "series_id"
+
+    df = load_feature_data()
+    min_rows = MIN_SEGMENT_ROWS
+    if segment_col not in df.columns:
+        print(f"⚠️ No '{segment_col}' column in the feature data "
+              f"(columns: {', '.join(df.columns)}); training the global model only")
+        df[segment_col] = 0
+        min_rows = len(df) + 1
+
+    metrics = train_segment_models(df, segment_col=segment_col, min_rows=min_rows)
+    print(metrics.head(20))
+    print(f"✅ {len(metrics)} models, median MAE {metrics['mae'].median():.2f}")
+    print(f"✅ Bundle written to {SEGMENT_BUNDLE_PATH} "
+          f"in {time.perf_counter() - started:.1f}s")
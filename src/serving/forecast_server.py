@@ -0,0 +1,422 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.data.load_data import load_feature_data
+from src.decision.pipeline import run_decision_pipeline
+from src.models.evaluate_forecast import FEATURES, add_uncertainty_bounds
+from src.models.registry import active_version, load_metadata, load_model
+
+RESULT_COLUMNS = [
+    "forecast",
+    "forecast_lower",
+    "forecast_upper",
+    "estimated_capacity",
+    "capacity_gap",
+    "risk_severity",
+    "worst_case_gap",
+    "uncertainty_aware_risk",
+    "sla_risk_cost",
+    "idle_cost",
+    "total_expected_cost"
+]
+
+SCORING_STAGES = ["capacity", "capacity_risk", "uncertainty_risk", "cost"]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# --------------------------------------------------
+# SCORING
+# --------------------------------------------------
+
+def validate_rows(rows):
+    """
+    Error message for an invalid /forecast payload, or None when every row
+    has a finite number for each of FEATURES. Checked before queueing, so
+    a bad request never reaches a shared batch.
+    """
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return "Expected \"rows\" to be a list of objects"
+
+    for i, row in enumerate(rows):
+        missing = [
+            col for col in FEATURES
+            if not isinstance(row.get(col), (int, float))
+            or isinstance(row.get(col), bool)
+            or not math.isfinite(row[col])
+        ]
+        if missing:
+            return f"Row {i}: missing or non-numeric features: {', '.join(missing)}"
+
+    return None
+
+
+def estimate_residual_std(model):
+    """
+    Residual std of `model` over the stored feature history, for models
+    registered without one (e.g. the legacy pickle)
+    """
+    df = load_feature_data(columns=FEATURES + ["demand"]).dropna()
+    return float(np.std(df["demand"] - model.predict(df[FEATURES])))
+
+
+def score_batch(df, model, residual_std=0.0, confidence=0.9):
+    """
+    One vectorized predict plus capacity -> risk -> cost for a whole batch.
+    Rows without an observed `demand` are scored on their forecast.
+    """
+    df = df.copy()
+    df["forecast"] = model.predict(df[FEATURES])
+    df = add_uncertainty_bounds(df, residual_std, confidence)
+
+    if "demand" not in df.columns:
+        df["demand"] = df["forecast"]
+    else:
+        df["demand"] = df["demand"].fillna(df["forecast"])
+
+    out = run_decision_pipeline(
+        df, SCORING_STAGES, outputs=RESULT_COLUMNS
+    ).astype({
+        "risk_severity": object,
+        "uncertainty_aware_risk": object
+    })
+    return out.to_dict("records")
+
+
+# --------------------------------------------------
+# MICRO-BATCHING
+# --------------------------------------------------
+
+class LatencyStats:
+    """
+    Rolling request-latency and batch-size statistics
+    """
+
+    def __init__(self, window=10_000):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.rejected = 0
+
+    def snapshot(self, queue_depth=0):
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "queue_depth": queue_depth,
+            "mean_batch_rows": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "latency_ms_p50": float(np.percentile(latencies, 50)),
+            "latency_ms_p95": float(np.percentile(latencies, 95)),
+            "latency_ms_p99": float(np.percentile(latencies, 99))
+        }
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into one batch per latency window.
+
+    A batch closes when `max_batch_rows` rows are queued or `max_wait_ms`
+    has passed since its first request, whichever comes first. The queue
+    is bounded: once `max_queue` requests are waiting, new ones are
+    rejected immediately (backpressure) instead of piling up latency.
+    """
+
+    def __init__(self, score_fn, max_batch_rows=512, max_wait_ms=5.0,
+                 max_queue=1000):
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = LatencyStats()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((rows, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            raise QueueFullError("Forecast queue is full")
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            n_rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+
+            await self._score(batch, n_rows)
+
+    async def _score(self, batch, n_rows):
+        frame = pd.DataFrame([row for rows, _, _ in batch for row in rows])
+
+        try:
+            # Run the CPU-bound scoring off the event loop so new
+            # requests keep being accepted meanwhile
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self.score_fn, frame
+            )
+        except Exception as exc:
+            if len(batch) == 1:
+                _, future, _ = batch[0]
+                if not future.done():
+                    future.set_exception(exc)
+                return
+
+            # Re-score one request at a time so the failure stays with
+            # the request that caused it
+            for item in batch:
+                await self._score([item], len(item[0]))
+            return
+
+        self.stats.batches += 1
+        self.stats.batch_sizes.append(n_rows)
+
+        start = 0
+        now = time.perf_counter()
+        for rows, future, submitted in batch:
+            if not future.done():
+                future.set_result(results[start:start + len(rows)])
+            start += len(rows)
+
+            self.stats.requests += 1
+            self.stats.rows += len(rows)
+            self.stats.latencies_ms.append((now - submitted) * 1000)
+
+
+# --------------------------------------------------
+# HTTP
+# --------------------------------------------------
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+
+    return method, path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+
+
+class ForecastServer:
+    """
+    Local HTTP (TCP or Unix socket) front end for the micro-batcher.
+
+    POST /forecast  {"rows": [{feature: value, ...}, ...]} -> {"results": [...]}
+    GET  /metrics   latency percentiles, batch sizes, queue depth
+    GET  /health
+    """
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self._dispatch(method, path, body)
+
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+
+        if method == "GET" and path == "/metrics":
+            return 200, self.batcher.stats.snapshot(self.batcher.queue.qsize())
+
+        if method == "POST" and path == "/forecast":
+            try:
+                rows = json.loads(body)["rows"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "Expected JSON body {\"rows\": [...]}"}
+
+            error = validate_rows(rows)
+            if error is not None:
+                return 400, {"error": error}
+            if not rows:
+                return 200, {"results": [], "latency_ms": 0.0}
+
+            started = time.perf_counter()
+            try:
+                results = await self.batcher.submit(rows)
+            except QueueFullError as exc:
+                return 503, {"error": str(exc)}
+            except KeyError as exc:
+                return 400, {"error": f"Missing column: {exc}"}
+            except Exception as exc:
+                return 500, {"error": str(exc)}
+
+            return 200, {
+                "results": results,
+                "latency_ms": (time.perf_counter() - started) * 1000
+            }
+
+        return 404, {"error": f"No route for {method} {path}"}
+
+
+async def serve(
+    host="127.0.0.1",
+    port=8765,
+    unix_socket=None,
+    model=None,
+    residual_std=None,
+    confidence=0.9,
+    max_batch_rows=512,
+    max_wait_ms=5.0,
+    max_queue=1000
+):
+    """
+    Serve `model` (default: the active registry version). Without an
+    explicit `residual_std` the one recorded at training time is used,
+    falling back to an estimate on the feature history.
+
+    Without an explicit `model`, every batch re-resolves the active
+    version through the registry (cached, so this is a dict lookup), and
+    an activated model is served from the next batch on, together with
+    its own residual std.
+    """
+    residual_stds = {}
+
+    def resolve():
+        if model is not None:
+            version, current = None, model
+        else:
+            version = active_version()
+            current = load_model(version, compiled=True)
+
+        if residual_std is not None:
+            return current, residual_std
+        if version not in residual_stds:
+            recorded = None
+            if model is None:
+                recorded = load_metadata(version).get("metrics", {}).get("residual_std")
+            residual_stds[version] = (
+                recorded if recorded is not None else estimate_residual_std(current)
+            )
+        return current, residual_stds[version]
+
+    def score(frame):
+        current, std = resolve()
+        return score_batch(frame, current, std, confidence)
+
+    # Load (and, if needed, estimate the band of) the first model up front
+    resolve()
+
+    batcher = MicroBatcher(
+        score,
+        max_batch_rows=max_batch_rows,
+        max_wait_ms=max_wait_ms,
+        max_queue=max_queue
+    )
+    batcher.start()
+    server = ForecastServer(batcher)
+
+    if unix_socket:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_socket)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching forecast server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket")
+    parser.add_argument("--residual-std", type=float, default=None,
+                        help="Default: the model's recorded residual std")
+    parser.add_argument("--max-batch-rows", type=int, default=512)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(serve(
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        residual_std=args.residual_std,
+        max_batch_rows=args.max_batch_rows,
+        max_wait_ms=args.max_wait_ms,
+        max_queue=args.max_queue
+    ))
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Points per chart; roughly one per horizontal pixel of a wide chart
+CHART_POINTS = 1000
+
+# Downsampled frames kept per process
+MAX_CACHED_CHARTS = 32
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+def minmax_indices(values, n_points=CHART_POINTS):
+    """
+    Row indices that keep the minimum and maximum of every column in each
+    of n_points / 2 equal-width buckets, plus the first and last row.
+
+    `values` is (n_rows,) or (n_rows, n_columns). Buckets are padded to a
+    common width and reduced with one argmin / argmax over a reshaped
+    view, so the cost is linear and independent of n_points. NaNs are
+    ignored (an all-NaN bucket contributes its first row).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+
+    n_rows = len(values)
+    n_buckets = max(n_points // 2, 1)
+    if n_rows <= n_points:
+        return np.arange(n_rows)
+
+    width = -(-n_rows // n_buckets)
+    n_buckets = -(-n_rows // width)
+    padded = np.full((n_buckets * width, values.shape[1]), np.nan)
+    padded[:n_rows] = values
+    blocks = padded.reshape(n_buckets, width, values.shape[1])
+
+    missing = np.isnan(blocks)
+    low = np.where(missing, np.inf, blocks).argmin(axis=1)
+    high = np.where(missing, -np.inf, blocks).argmax(axis=1)
+
+    offsets = (np.arange(n_buckets) * width)[:, None]
+    keep = np.concatenate([
+        (low + offsets).ravel(),
+        (high + offsets).ravel(),
+        [0, n_rows - 1]
+    ])
+    return np.unique(keep[keep < n_rows])
+
+
+def downsample_frame(df, y_cols, n_points=CHART_POINTS):
+    """
+    Rows of `df` (already in x order) that keep the peaks and troughs of
+    every `y_cols` column within a budget of about n_points per column
+    """
+    if len(df) <= n_points:
+        return df[y_cols]
+    return df[y_cols].iloc[minmax_indices(df[y_cols].to_numpy(dtype=np.float64), n_points)]
+
+
+def chart_frame(df, x_col, y_cols, n_points=CHART_POINTS):
+    """
+    Chart-ready frame indexed by `x_col`. Rows sharing an x value (several
+    series on one date) are summed first, then the result is downsampled.
+    """
+    x = df[x_col]
+    if x.is_monotonic_increasing and x.is_unique:
+        frame = df.set_index(x_col)
+    else:
+        frame = df.groupby(x_col, sort=True)[y_cols].sum()
+    return downsample_frame(frame, y_cols, n_points)
+
+
+def cached_chart_frame(key, df, x_col, y_cols, n_points=CHART_POINTS):
+    """
+    `chart_frame` memoized under a caller-supplied `key`, e.g. (scenario,
+    date range, filters, chart); the caller must change the key whenever
+    the data behind it changes. `df` may be a callable returning the
+    frame, so it is only built on a cache miss.
+    """
+    key = (key, x_col, tuple(y_cols), n_points)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    if callable(df):
+        df = df()
+    frame = chart_frame(df, x_col, y_cols, n_points)
+
+    with _lock:
+        _cache[key] = frame
+        while len(_cache) > MAX_CACHED_CHARTS:
+            _cache.popitem(last=False)
+    return frame
+
+
+def clear_chart_cache():
+    with _lock:
+        _cache.clear()
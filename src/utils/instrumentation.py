@@ -0,0 +1,272 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Comma-separated switches, e.g. DEMAND_INSTRUMENTATION=on,profile,memory
+#   on      -> timings, rows in/out, RSS deltas, cache hits
+#   profile -> also a cProfile per stage
+#   memory  -> also tracemalloc peak allocation per stage
+INSTRUMENTATION_ENV = "DEMAND_INSTRUMENTATION"
+
+_config = {"enabled": False, "profile": False, "memory": False}
+_lock = threading.Lock()
+_local = threading.local()
+
+_stages = {}
+_caches = {}
+_profiles = {}
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def configure(enabled=None, profile=None, memory=None):
+    """
+    Override the environment switches at runtime; profile / memory imply
+    enabled
+    """
+    if enabled is not None:
+        _config["enabled"] = enabled
+    if profile is not None:
+        _config["profile"] = profile
+    if memory is not None:
+        _config["memory"] = memory
+    if _config["profile"] or _config["memory"]:
+        _config["enabled"] = True
+
+
+def _configure_from_env():
+    switches = {
+        s.strip().lower()
+        for s in os.environ.get(INSTRUMENTATION_ENV, "").split(",")
+    }
+    configure(
+        enabled=bool(switches & {"1", "on", "true"}),
+        profile="profile" in switches,
+        memory="memory" in switches
+    )
+
+
+_configure_from_env()
+
+
+def is_enabled():
+    return _config["enabled"]
+
+
+# --------------------------------------------------
+# RECORDING
+# --------------------------------------------------
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _rows(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _record(stage, seconds, rows_in, rows_out, rss_delta, peak_alloc, failed):
+    with _lock:
+        m = _stages.setdefault(stage, {
+            "calls": 0,
+            "errors": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "last_seconds": 0.0,
+            "rows_in": 0,
+            "rows_out": 0,
+            "last_rss_delta_bytes": 0,
+            "max_peak_alloc_bytes": None
+        })
+        m["calls"] += 1
+        m["errors"] += failed
+        m["total_seconds"] += seconds
+        m["max_seconds"] = max(m["max_seconds"], seconds)
+        m["last_seconds"] = seconds
+        m["rows_in"] += rows_in or 0
+        m["rows_out"] += rows_out or 0
+        m["last_rss_delta_bytes"] = rss_delta
+        if peak_alloc is not None:
+            m["max_peak_alloc_bytes"] = max(m["max_peak_alloc_bytes"] or 0, peak_alloc)
+
+
+@contextmanager
+def stage_timer(stage, rows_in=None):
+    """
+    Record one run of `stage`. Yields a dict; set "rows_out" in it to
+    report output rows. Profiling and tracemalloc only wrap the outermost
+    stage, so nested stages do not disturb each other.
+    """
+    info = {"rows_out": None}
+    if not _config["enabled"]:
+        yield info
+        return
+
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    outermost = depth == 0
+
+    profiler = None
+    if outermost and _config["profile"]:
+        profiler = cProfile.Profile()
+
+    trace = outermost and _config["memory"]
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    rss_before = _rss_bytes()
+    failed = False
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield info
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        peak_alloc = tracemalloc.get_traced_memory()[1] if trace else None
+        _local.depth = depth
+
+        _record(
+            stage, seconds, rows_in, info["rows_out"],
+            _rss_bytes() - rss_before, peak_alloc, failed
+        )
+        if profiler is not None:
+            with _lock:
+                if stage in _profiles:
+                    _profiles[stage].add(profiler)
+                else:
+                    _profiles[stage] = pstats.Stats(profiler)
+
+
+def instrument(stage=None):
+    """
+    Decorator recording every call as `stage` (default: function name).
+    When instrumentation is off the only cost is one flag check.
+    """
+    def decorate(fn):
+        name = stage or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _config["enabled"]:
+                return fn(*args, **kwargs)
+
+            with stage_timer(name, _rows(args[0]) if args else None) as info:
+                result = fn(*args, **kwargs)
+                info["rows_out"] = _rows(result)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def record_cache(cache, hit):
+    if not _config["enabled"]:
+        return
+    with _lock:
+        counts = _caches.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def reset_metrics():
+    with _lock:
+        _stages.clear()
+        _caches.clear()
+        _profiles.clear()
+
+
+# --------------------------------------------------
+# EXPORT
+# --------------------------------------------------
+
+def metrics_snapshot():
+    with _lock:
+        return {
+            "enabled": dict(_config),
+            "stages": {stage: dict(m) for stage, m in _stages.items()},
+            "caches": {cache: dict(c) for cache, c in _caches.items()}
+        }
+
+
+def profile_report(stage, limit=25, sort="cumulative"):
+    with _lock:
+        stats = _profiles.get(stage)
+        if stats is None:
+            return ""
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def export_json(path):
+    with open(path, "w") as f:
+        json.dump(metrics_snapshot(), f, indent=2)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    """
+    Metrics in the Prometheus text exposition format
+    """
+    snapshot = metrics_snapshot()
+    series = [
+        ("demand_stage_calls_total", "counter", "Stage invocations", "calls"),
+        ("demand_stage_errors_total", "counter", "Stage invocations that raised", "errors"),
+        ("demand_stage_seconds_total", "counter", "Total stage wall time", "total_seconds"),
+        ("demand_stage_seconds_max", "gauge", "Slowest stage run", "max_seconds"),
+        ("demand_stage_seconds_last", "gauge", "Latest stage run", "last_seconds"),
+        ("demand_stage_rows_in_total", "counter", "Rows passed into the stage", "rows_in"),
+        ("demand_stage_rows_out_total", "counter", "Rows returned by the stage", "rows_out"),
+        ("demand_stage_rss_delta_bytes", "gauge", "RSS change over the latest run", "last_rss_delta_bytes"),
+        ("demand_stage_peak_alloc_bytes", "gauge", "Peak traced allocation", "max_peak_alloc_bytes"),
+    ]
+
+    lines = []
+    for name, kind, help_text, key in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stage, m in sorted(snapshot["stages"].items()):
+            if m[key] is not None:
+                lines.append(f'{name}{{stage="{_label(stage)}"}} {m[key]}')
+
+    for result in ["hits", "misses"]:
+        name = f"demand_cache_{result}_total"
+        lines.append(f"# HELP {name} Cache {result}")
+        lines.append(f"# TYPE {name} counter")
+        for cache, counts in sorted(snapshot["caches"].items()):
+            lines.append(f'{name}{{cache="{_label(cache)}"}} {counts[result]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path):
+    with open(path, "w") as f:
+        f.write(prometheus_text())
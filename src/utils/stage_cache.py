@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.data.compact_schema import compact_column
+from src.utils.instrumentation import record_cache, stage_timer
+
+# Stage results kept before the least recently used one is evicted
+MAX_CACHED_STAGES = 64
+
+
+class StageCache:
+    """
+    Thread-safe LRU of pipeline stage outputs ({column: values}).
+
+    One instance can be shared by every dashboard session, so a scenario
+    computed by one user is a cache hit for the next.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_STAGES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            outputs = self._entries.get(key)
+            if outputs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return outputs
+
+    def put(self, key, outputs):
+        with self._lock:
+            self._entries[key] = outputs
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# --------------------------------------------------
+# PROVENANCE TOKENS
+# --------------------------------------------------
+
+def _digest(payload):
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()[:20]
+
+
+def column_tokens(df):
+    """
+    Content hash of every column of a source frame.
+
+    Only source columns are ever hashed; columns produced by a stage get a
+    token derived from the stage, its parameters and its input tokens, so
+    checking a stage for changes never touches the data again.
+    """
+    return {
+        col: hashlib.sha256(
+            pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes()
+        ).hexdigest()[:20]
+        for col in df.columns
+    }
+
+
+def run_stage(cache, columns, tokens, name, fn, reads, writes, params=None,
+              compact=False):
+    """
+    Run `fn(frame_of_reads, **params)` unless the same stage already ran on
+    identical inputs, and store the `writes` columns into `columns`.
+
+    `columns` maps column name -> values and `tokens` column name ->
+    provenance token; both are updated in place. With compact=True the
+    outputs are cached in their compact dtypes. Returns True on a cache
+    hit.
+    """
+    params = params or {}
+    key = _digest([name, params, compact, [(col, tokens[col]) for col in reads]])
+
+    outputs = cache.get(key)
+    hit = outputs is not None
+    record_cache("stage_cache", hit)
+
+    if not hit:
+        frame = pd.DataFrame({col: columns[col] for col in reads})
+        with stage_timer(f"stage:{name}", len(frame)) as info:
+            result = fn(frame, **params)
+            info["rows_out"] = len(result)
+        outputs = {col: result[col].values for col in writes}
+        if compact:
+            outputs = {col: compact_column(col, v) for col, v in outputs.items()}
+        cache.put(key, outputs)
+
+    for col in writes:
+        columns[col] = outputs[col]
+        tokens[col] = _digest([key, col])
+
+    return hit